@@ -1,6 +1,7 @@
 import os
 import sys
 import time
+import uuid
 from pathlib import Path
 
 import streamlit as st
@@ -11,6 +12,7 @@ sys.path.append(str(parent_dir))
 
 from core.rag_service import RAGService
 from core.indexing_pipeline import IndexingPipeline
+from core.indexing_jobs import IndexingJobManager, FINISHED_STATUSES
 from config.config import APP_NAME, APP_DESCRIPTION
 
 
@@ -25,24 +27,86 @@ st.set_page_config(
 # Initialiser les services dans une fonction pour éviter la réinitialisation à chaque interaction
 @st.cache_resource
 def init_services():
+    indexing_pipeline = IndexingPipeline()
     return {
-        "rag_service": RAGService(),
-        "indexing_pipeline": IndexingPipeline()
+        "rag_service": RAGService(indexing_pipeline=indexing_pipeline),
+        "indexing_pipeline": indexing_pipeline,
+        "indexing_jobs": IndexingJobManager(indexing_pipeline)
     }
 
 # Récupérer les services
 services = init_services()
 rag_service = services["rag_service"]
 indexing_pipeline = services["indexing_pipeline"]
+indexing_jobs = services["indexing_jobs"]
 
 # Initialiser l'historique des messages s'il n'existe pas dans la session
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+# Identifiant de conversation: historique compacté et session du fournisseur réutilisés
+if "conversation_id" not in st.session_state:
+    st.session_state.conversation_id = uuid.uuid4().hex
+
 # Initialiser le mode d'utilisation
 if "use_rag" not in st.session_state:
     st.session_state.use_rag = True
 
+# Tâches d'indexation soumises depuis cette session
+if "job_ids" not in st.session_state:
+    st.session_state.job_ids = []
+
+# Fichiers téléchargés déjà soumis (le widget conserve le fichier entre les réexécutions)
+if "submitted_uploads" not in st.session_state:
+    st.session_state.submitted_uploads = set()
+
+
+JOB_STATUS_LABELS = {
+    "pending": "En attente",
+    "running": "En cours",
+    "completed": "Terminée",
+    "completed_with_errors": "Terminée avec erreurs",
+    "failed": "Échec",
+    "cancelled": "Annulée"
+}
+
+
+def render_indexing_jobs():
+    """Afficher la progression des tâches d'indexation de la session."""
+    for job_id in reversed(st.session_state.job_ids):
+        job = indexing_jobs.get_job(job_id)
+        if job is None:
+            continue
+        
+        label = "Réindexation" if job["kind"] == "reindex" else ", ".join(Path(f).name for f in job["files"])
+        status = JOB_STATUS_LABELS.get(job["status"], job["status"])
+        progress = job["files_done"] / job["files_total"] if job["files_total"] else 1.0
+        if job["status"] in ("completed", "completed_with_errors"):
+            progress = 1.0
+        
+        st.progress(
+            min(progress, 1.0),
+            text=f"{label} — {status} ({job['files_done']}/{job['files_total']} fichiers, "
+                 f"{job['chunks_done']} chunks)"
+        )
+        
+        if job["status"] in ("failed", "completed_with_errors") and job["error"]:
+            message = "\n".join(
+                [job["error"]] + [f"- {item['file']} : {item['error']}" for item in job.get("failed_files", [])]
+            )
+            if job["status"] == "failed":
+                st.error(message)
+            else:
+                st.warning(message)
+        elif job["status"] not in FINISHED_STATUSES:
+            if st.button("Annuler", key=f"cancel_{job_id}"):
+                indexing_jobs.cancel(job_id)
+
+
+# Rafraîchir uniquement le panneau des tâches, sans bloquer le reste de la page
+if hasattr(st, "fragment"):
+    render_indexing_jobs = st.fragment(run_every=2)(render_indexing_jobs)
+
 
 def main():
     # Titre et description
@@ -67,19 +131,25 @@ def main():
         )
         
         if uploaded_file:
-            with st.spinner("Traitement du fichier en cours..."):
-                file_path = indexing_pipeline.save_uploaded_file(uploaded_file)
-                if file_path:
-                    st.success(f"Le fichier {uploaded_file.name} a été traité avec succès!")
-                else:
-                    st.error(f"Erreur lors du traitement du fichier {uploaded_file.name}")
+            upload_key = (uploaded_file.name, uploaded_file.size)
+            if upload_key not in st.session_state.submitted_uploads:
+                try:
+                    job_id = indexing_jobs.submit_upload(uploaded_file)
+                    st.session_state.job_ids.append(job_id)
+                    st.session_state.submitted_uploads.add(upload_key)
+                    st.success(f"Le fichier {uploaded_file.name} a été ajouté à la file d'indexation.")
+                except Exception as e:
+                    st.error(f"Erreur lors de la sauvegarde du fichier {uploaded_file.name}: {str(e)}")
         
         # Option pour réindexer tous les documents
         if st.button("Réindexer tous les documents"):
-            with st.spinner("Réindexation en cours..."):
-                indexing_pipeline.clear_index()
-                num_indexed = indexing_pipeline.index_directory()
-                st.success(f"Réindexation terminée. {num_indexed} chunks indexés.")
+            job_id = indexing_jobs.submit_reindex()
+            st.session_state.job_ids.append(job_id)
+        
+        # Suivi des tâches d'indexation
+        if st.session_state.job_ids:
+            st.subheader("Tâches d'indexation")
+            render_indexing_jobs()
         
         # Option pour choisir entre RAG et requête directe
         st.header("⚙️ Options")
@@ -111,7 +181,11 @@ def main():
             # Générer la réponse
             with st.chat_message("assistant"):
                 with st.spinner("Réflexion en cours..."):
-                    response = rag_service.process_query(query, use_rag=st.session_state.use_rag)
+                    response = rag_service.process_chat(
+                        st.session_state.messages,
+                        conversation_id=st.session_state.conversation_id,
+                        use_rag=st.session_state.use_rag
+                    )
                     
                     # Afficher la réponse
                     st.markdown(response["answer"])
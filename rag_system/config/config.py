@@ -10,10 +10,13 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 EMBEDDINGS_DIR = DATA_DIR / "embeddings"
 DOCUMENTS_DIR = DATA_DIR / "documents"
+JOBS_DIR = DATA_DIR / "jobs"
+PROFILES_DIR = DATA_DIR / "profiles"
 
 # Créer les répertoires s'ils n'existent pas
 os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
 os.makedirs(DOCUMENTS_DIR, exist_ok=True)
+os.makedirs(JOBS_DIR, exist_ok=True)
 
 # Configuration ElasticSearch
 ELASTICSEARCH_URL = os.getenv("ELASTICSEARCH_URL", "http://localhost:9200")
@@ -25,11 +28,65 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-pro")
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # Durée de maintien du modèle en mémoire
+
+# Configuration du planificateur d'appels LLM
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))  # Appels simultanés par fournisseur
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))  # Échéance d'un appel (secondes)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))  # Réessais sur limite de débit
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))
+
+# Configuration du chat
+CHAT_TOKEN_BUDGET = int(os.getenv("CHAT_TOKEN_BUDGET", "2000"))  # Budget de tokens de l'historique
+CHAT_RECENT_TURNS = int(os.getenv("CHAT_RECENT_TURNS", "4"))  # Tours conservés tels quels
 
 # Configuration des embeddings
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface")  # 'huggingface' (PyTorch) ou 'onnx'
+ONNX_MODEL_DIR = Path(os.getenv(
+    "ONNX_MODEL_DIR", str(EMBEDDINGS_DIR / "onnx" / EMBEDDING_MODEL.replace("/", "__"))
+))
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "false").lower() == "true"  # Quantification int8 dynamique
+EMBEDDING_NUM_THREADS = int(os.getenv("EMBEDDING_NUM_THREADS", "0"))  # 0 = choix automatique
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_WORKER = os.getenv("EMBEDDING_WORKER", "none")  # 'none', 'inprocess' ou 'sidecar'
+EMBEDDING_WORKER_URL = os.getenv("EMBEDDING_WORKER_URL", "http://127.0.0.1:8765")
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+PCA_VERSION = os.getenv("PCA_VERSION", "")  # Projection PCA des nouveaux index: '', 'latest' ou un numéro
+
+# Configuration de l'indexation
+INDEXING_BATCH_SIZE = int(os.getenv("INDEXING_BATCH_SIZE", "256"))  # Chunks par requête bulk
+INDEXING_WORKERS = int(os.getenv("INDEXING_WORKERS", "2"))  # Tâches d'indexation en parallèle
+VECTOR_ENCODING = os.getenv("VECTOR_ENCODING", "float")  # 'float' ou 'base64' (ElasticSearch >= 9.1)
+
+# Configuration de l'indexation continue (python main.py watch)
+WATCH_DEBOUNCE_S = float(os.getenv("WATCH_DEBOUNCE_S", "1.0"))  # Calme requis avant de traiter un lot
+WATCH_MAX_DELAY_S = float(os.getenv("WATCH_MAX_DELAY_S", "5.0"))  # Délai maximal pendant une rafale continue
+WATCH_MAX_BATCH_FILES = int(os.getenv("WATCH_MAX_BATCH_FILES", "50"))  # Fichiers par lot
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"  # Élimination des chunks dupliqués
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))  # Similarité de Jaccard des quasi-doublons
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))
+
+# Configuration de la recherche vectorielle
+SEARCH_MODE = os.getenv("SEARCH_MODE", "exact")  # 'exact' (script_score) ou 'ann' (kNN HNSW)
+KNN_NUM_CANDIDATES = int(os.getenv("KNN_NUM_CANDIDATES", "100"))
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw")  # 'hnsw' ou 'int8_hnsw'
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))
+SEARCH_STRATEGY = os.getenv("SEARCH_STRATEGY", "similarity")  # 'similarity' ou 'mmr' (résultats diversifiés)
+MMR_FETCH_K = int(os.getenv("MMR_FETCH_K", "20"))  # Candidats récupérés avant la sélection MMR
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.5"))  # 1 = pertinence seule, 0 = diversité seule
+
+# Configuration du reranking (cross-encoder)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))  # Candidats récupérés avant reranking
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "3"))  # Chunks gardés pour le LLM
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))  # Au-delà, l'ordre vectoriel est conservé
 
 # Configuration de l'application
 APP_NAME = "Système RAG avec ElasticSearch et LangChain"
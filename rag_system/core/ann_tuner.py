@@ -0,0 +1,226 @@
+import time
+import itertools
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+
+from core.elasticsearch_manager import ElasticsearchManager
+
+
+class ANNTuner:
+    """Outil pour mesurer le rappel et la latence de la recherche approximative (kNN).
+
+    La recherche exacte (cosineSimilarity) sert de vérité terrain : pour chaque
+    configuration (num_candidates, m, ef_construction, type d'index), on compare
+    le top-k approximatif au top-k exact et on mesure la latence.
+    """
+
+    def __init__(self, es_manager: Optional[ElasticsearchManager] = None):
+        self.es_manager = es_manager or ElasticsearchManager()
+        self.client = self.es_manager.client
+        self.index_name = self.es_manager.index_name
+
+    def load_queries(self, queries_file: Union[str, Path]) -> List[str]:
+        """Charger des requêtes depuis un fichier texte (une requête par ligne)."""
+        with open(queries_file, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def sample_queries(self, num_queries: int = 50, seed: int = 42, max_length: int = 200) -> List[str]:
+        """Échantillonner des requêtes à partir d'extraits de chunks indexés."""
+        response = self.client.search(
+            index=self.index_name,
+            body={
+                "query": {
+                    "function_score": {
+                        "query": {"match_all": {}},
+                        "random_score": {"seed": seed, "field": "_seq_no"}
+                    }
+                },
+                "_source": ["text"],
+                "size": num_queries
+            }
+        )
+
+        queries = []
+        for hit in response["hits"]["hits"]:
+            text = " ".join(hit["_source"]["text"].split())
+            # Utiliser la première phrase comme requête pour ne pas retrouver le chunk entier
+            sentence = text.split(". ")[0][:max_length]
+            if sentence:
+                queries.append(sentence)
+
+        return queries
+
+    def _current_vector_options(self) -> Dict[str, Any]:
+        """Lire les paramètres du champ vectoriel de l'index principal."""
+        mapping = self.client.indices.get_mapping(index=self.index_name)
+        vector_mapping = mapping[self.index_name]["mappings"]["properties"]["vector"]
+        index_options = vector_mapping.get("index_options", {})
+
+        return {
+            "dims": vector_mapping["dims"],
+            "index_type": index_options.get("type", "hnsw"),
+            "m": index_options.get("m", 16),
+            "ef_construction": index_options.get("ef_construction", 100)
+        }
+
+    def _build_variant_index(self, dims: int, index_type: str, m: int, ef_construction: int) -> str:
+        """Créer une copie de l'index principal avec d'autres paramètres HNSW."""
+        variant_name = f"{self.index_name}_ann_{index_type}_m{m}_ef{ef_construction}"
+
+        if self.client.indices.exists(index=variant_name):
+            self.client.indices.delete(index=variant_name)
+
+        mapping = {
+            "mappings": {
+                "properties": {
+                    "text": {"type": "text"},
+                    "metadata": {"type": "object"},
+                    "vector": ElasticsearchManager.build_vector_mapping(
+                        dims=dims,
+                        index_type=index_type,
+                        m=m,
+                        ef_construction=ef_construction
+                    )
+                }
+            }
+        }
+        self.client.indices.create(index=variant_name, body=mapping)
+
+        print(f"Construction de l'index {variant_name}...")
+        self.client.options(request_timeout=3600).reindex(
+            body={"source": {"index": self.index_name}, "dest": {"index": variant_name}},
+            wait_for_completion=True
+        )
+        self.client.indices.refresh(index=variant_name)
+
+        return variant_name
+
+    def _timed_search(self, query_vector: List[float], k: int, **kwargs) -> Dict[str, Any]:
+        """Exécuter une recherche et mesurer sa latence côté client."""
+        start = time.perf_counter()
+        results = self.es_manager.search_by_vector(query_vector, k=k, **kwargs)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        return {"ids": [result["id"] for result in results], "latency_ms": latency_ms}
+
+    @staticmethod
+    def _percentile(values: List[float], percentile: float) -> float:
+        """Calculer un percentile simple (plus proche rang)."""
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        rank = min(len(ordered) - 1, max(0, int(round(percentile / 100 * len(ordered))) - 1))
+        return ordered[rank]
+
+    def run(
+        self,
+        queries: List[str],
+        k: int = 5,
+        num_candidates_values: List[int] = (50, 100, 200),
+        m_values: List[int] = (16,),
+        ef_construction_values: List[int] = (100,),
+        index_types: List[str] = ("hnsw",),
+        warmup: int = 3,
+        keep_indices: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Balayer les paramètres kNN et mesurer rappel@k et latence pour chacun."""
+        if not queries:
+            raise ValueError("Aucune requête disponible pour le réglage.")
+
+        print(f"Calcul des embeddings de {len(queries)} requêtes...")
+        query_vectors = [self.es_manager.embeddings.embed_query(query) for query in queries]
+
+        # Vérité terrain: top-k exact sur l'index principal
+        print("Calcul du top-k exact (vérité terrain)...")
+        for vector in query_vectors[:warmup]:
+            self._timed_search(vector, k, mode="exact")
+        exact_runs = [self._timed_search(vector, k, mode="exact") for vector in query_vectors]
+        ground_truth = [set(run["ids"]) for run in exact_runs]
+        exact_latencies = [run["latency_ms"] for run in exact_runs]
+
+        results = [{
+            "index_type": "exact",
+            "m": None,
+            "ef_construction": None,
+            "num_candidates": None,
+            "recall": 1.0,
+            "p50_ms": self._percentile(exact_latencies, 50),
+            "p95_ms": self._percentile(exact_latencies, 95)
+        }]
+
+        current = self._current_vector_options()
+        created_indices = []
+
+        try:
+            for index_type, m, ef_construction in itertools.product(index_types, m_values, ef_construction_values):
+                if (index_type, m, ef_construction) == (current["index_type"], current["m"], current["ef_construction"]):
+                    index_name = self.index_name
+                else:
+                    index_name = self._build_variant_index(current["dims"], index_type, m, ef_construction)
+                    created_indices.append(index_name)
+
+                for num_candidates in num_candidates_values:
+                    search_kwargs = {"mode": "ann", "num_candidates": num_candidates, "index_name": index_name}
+
+                    for vector in query_vectors[:warmup]:
+                        self._timed_search(vector, k, **search_kwargs)
+
+                    recalls = []
+                    latencies = []
+                    for vector, expected in zip(query_vectors, ground_truth):
+                        run = self._timed_search(vector, k, **search_kwargs)
+                        latencies.append(run["latency_ms"])
+                        if expected:
+                            recalls.append(len(expected.intersection(run["ids"])) / len(expected))
+
+                    result = {
+                        "index_type": index_type,
+                        "m": m,
+                        "ef_construction": ef_construction,
+                        "num_candidates": num_candidates,
+                        "recall": sum(recalls) / len(recalls) if recalls else 0.0,
+                        "p50_ms": self._percentile(latencies, 50),
+                        "p95_ms": self._percentile(latencies, 95)
+                    }
+                    results.append(result)
+                    print(
+                        f"{index_type} m={m} ef_construction={ef_construction} "
+                        f"num_candidates={num_candidates}: rappel@{k}={result['recall']:.3f}, "
+                        f"p50={result['p50_ms']:.1f} ms"
+                    )
+        finally:
+            if not keep_indices:
+                for index_name in created_indices:
+                    self.client.indices.delete(index=index_name, ignore_unavailable=True)
+
+        return results
+
+    @staticmethod
+    def recommend(results: List[Dict[str, Any]], target_recall: float) -> Optional[Dict[str, Any]]:
+        """Choisir la configuration ANN la plus rapide qui atteint le rappel cible."""
+        candidates = [
+            result for result in results
+            if result["index_type"] != "exact" and result["recall"] >= target_recall
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda result: result["p50_ms"])
+
+    @staticmethod
+    def format_report(results: List[Dict[str, Any]], k: int) -> str:
+        """Mettre en forme les résultats sous forme de tableau."""
+        header = f"{'type':<10} {'m':>4} {'ef_c':>5} {'num_cand':>8} {f'rappel@{k}':>10} {'p50 ms':>8} {'p95 ms':>8}"
+        lines = [header, "-" * len(header)]
+
+        for result in results:
+            lines.append(
+                f"{result['index_type']:<10} "
+                f"{result['m'] if result['m'] is not None else '-':>4} "
+                f"{result['ef_construction'] if result['ef_construction'] is not None else '-':>5} "
+                f"{result['num_candidates'] if result['num_candidates'] is not None else '-':>8} "
+                f"{result['recall']:>10.3f} "
+                f"{result['p50_ms']:>8.1f} "
+                f"{result['p95_ms']:>8.1f}"
+            )
+
+        return "\n".join(lines)
@@ -0,0 +1,108 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Callable, Optional
+
+from config.config import CHAT_TOKEN_BUDGET, CHAT_RECENT_TURNS
+from core.llm_scheduler import PRIORITY_NORMAL
+
+
+class ConversationManager:
+    """Borne la taille de l'historique de chat envoyé au LLM.
+
+    Les derniers tours sont conservés tels quels; les plus anciens sont remplacés
+    par un résumé mis en cache. Le point de coupure n'avance que par paliers, de
+    sorte que le préfixe (résumé + premiers messages récents) reste identique d'un
+    tour à l'autre et puisse être réutilisé par le fournisseur.
+    """
+
+    def __init__(
+        self,
+        summarize: Callable[[str, int], str],
+        token_budget: int = CHAT_TOKEN_BUDGET,
+        recent_turns: int = CHAT_RECENT_TURNS,
+        max_cached_summaries: int = 256
+    ):
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.recent_messages = max(2, recent_turns * 2)
+        self.max_cached_summaries = max_cached_summaries
+
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Estimer le nombre de tokens d'un texte (environ 4 caractères par token)."""
+        return max(1, len(text) // 4)
+
+    def _count_tokens(self, messages: List[Dict[str, str]], summary: Optional[str] = None) -> int:
+        total = sum(self.estimate_tokens(msg["content"]) for msg in messages)
+        if summary:
+            total += self.estimate_tokens(summary)
+        return total
+
+    @staticmethod
+    def _format_transcript(messages: List[Dict[str, str]]) -> str:
+        """Mettre des messages sous forme de transcription textuelle."""
+        labels = {"user": "Utilisateur", "assistant": "Assistant"}
+        return "\n".join(f"{labels.get(msg['role'], msg['role'])}: {msg['content']}" for msg in messages)
+
+    def _prefix_hashes(self, messages: List[Dict[str, str]]) -> List[str]:
+        """Calculer le hash de chaque préfixe de la liste de messages."""
+        running = hashlib.sha1()
+        hashes = []
+        for msg in messages:
+            running.update(f"{msg['role']}\x00{msg['content']}\x01".encode("utf-8"))
+            hashes.append(running.hexdigest())
+        return hashes
+
+    def _get_summary(self, older: List[Dict[str, str]], priority: int = PRIORITY_NORMAL) -> str:
+        """Obtenir le résumé des anciens messages, en repartant du plus long résumé en cache."""
+        hashes = self._prefix_hashes(older)
+
+        with self._lock:
+            if hashes[-1] in self._summaries:
+                self._summaries.move_to_end(hashes[-1])
+                return self._summaries[hashes[-1]]
+
+            previous_summary, start = None, 0
+            for index in range(len(hashes) - 2, -1, -1):
+                if hashes[index] in self._summaries:
+                    previous_summary, start = self._summaries[hashes[index]], index + 1
+                    break
+
+        text = self._format_transcript(older[start:])
+        if previous_summary:
+            text = f"Résumé de la conversation jusqu'ici:\n{previous_summary}\n\nSuite de la conversation:\n{text}"
+        summary = self.summarize(text, priority)
+
+        with self._lock:
+            self._summaries[hashes[-1]] = summary
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+
+        return summary
+
+    def compact(self, messages: List[Dict[str, str]], priority: int = PRIORITY_NORMAL) -> Dict[str, Any]:
+        """Réduire l'historique au budget de tokens.
+
+        Le point de coupure est choisi d'après l'estimation des tokens, en
+        réservant un quart du budget au résumé; un seul résumé est ensuite
+        demandé, avec la priorité de l'appel qui l'attend. Retourne le résumé des anciens messages (ou None) et les
+        messages conservés.
+        """
+        if len(messages) < 2 or self._count_tokens(messages) <= self.token_budget:
+            return {"summary": None, "messages": messages}
+
+        summary_budget = self.token_budget // 4
+
+        # Coupure par paliers de `recent_messages` pour garder un préfixe stable
+        split = ((len(messages) - self.recent_messages) // self.recent_messages) * self.recent_messages
+        split = min(max(split, 2), len(messages) - 1)
+
+        # Si les messages récents dépassent encore le budget, avancer tour par tour
+        while split < len(messages) - 1 and self._count_tokens(messages[split:]) + summary_budget > self.token_budget:
+            split = min(split + 2, len(messages) - 1)
+
+        return {"summary": self._get_summary(messages[:split], priority), "messages": messages[split:]}
@@ -0,0 +1,211 @@
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from core.serialization import decode_vector
+from config.config import EMBEDDINGS_DIR
+
+
+PCA_DIR = EMBEDDINGS_DIR / "pca"
+
+
+class PCAProjection:
+    """Projection PCA des embeddings, versionnée et sauvegardée sur disque.
+
+    La même version doit être appliquée à l'indexation et aux requêtes; elle est
+    enregistrée dans les métadonnées (`_meta`) de l'index ElasticSearch.
+    """
+
+    def __init__(
+        self,
+        mean: np.ndarray,
+        components: np.ndarray,
+        version: int,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32)
+        self.version = version
+        self.metadata = metadata or {}
+
+    @property
+    def input_dims(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def output_dims(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, dims: int, version: int, metadata: Optional[Dict[str, Any]] = None) -> "PCAProjection":
+        """Ajuster la projection sur un échantillon de vecteurs du corpus."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if dims >= vectors.shape[1]:
+            raise ValueError(f"La dimension cible ({dims}) doit être inférieure à celle des vecteurs ({vectors.shape[1]}).")
+        if len(vectors) < dims:
+            raise ValueError(f"Au moins {dims} vecteurs sont nécessaires pour ajuster une projection en {dims} dimensions.")
+
+        mean = vectors.mean(axis=0)
+        _, singular_values, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+        variance = singular_values ** 2
+
+        metadata = dict(metadata or {})
+        metadata["explained_variance"] = float(variance[:dims].sum() / variance.sum())
+        metadata["sample_size"] = len(vectors)
+
+        return cls(mean, vt[:dims], version, metadata)
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """Projeter des vecteurs puis les renormaliser (similarité cosinus)."""
+        projected = (np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components.T
+        return projected / np.clip(np.linalg.norm(projected, axis=-1, keepdims=True), 1e-12, None)
+
+    def save(self, directory: Union[str, Path] = PCA_DIR) -> Path:
+        """Sauvegarder la projection sous `pca_v<version>.npz`."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"pca_v{self.version}.npz"
+
+        np.savez(
+            path,
+            mean=self.mean,
+            components=self.components,
+            metadata=np.array(json.dumps(self.metadata))
+        )
+        return path
+
+    @classmethod
+    def load(cls, version: int, directory: Union[str, Path] = PCA_DIR) -> "PCAProjection":
+        """Charger une version de projection."""
+        path = Path(directory) / f"pca_v{version}.npz"
+        if not path.exists():
+            raise FileNotFoundError(f"La projection PCA {path} n'existe pas.")
+
+        with np.load(path) as data:
+            return cls(
+                data["mean"],
+                data["components"],
+                version,
+                json.loads(str(data["metadata"]))
+            )
+
+
+def list_versions(directory: Union[str, Path] = PCA_DIR) -> List[int]:
+    """Lister les versions de projection disponibles."""
+    versions = []
+    for path in Path(directory).glob("pca_v*.npz"):
+        try:
+            versions.append(int(path.stem[len("pca_v"):]))
+        except ValueError:
+            continue
+    return sorted(versions)
+
+
+def resolve_version(setting: str, directory: Union[str, Path] = PCA_DIR) -> Optional[int]:
+    """Convertir le réglage PCA_VERSION ('', 'latest' ou un numéro) en version."""
+    setting = (setting or "").strip().lower()
+    if not setting:
+        return None
+    if setting == "latest":
+        versions = list_versions(directory)
+        if not versions:
+            raise FileNotFoundError("Aucune projection PCA disponible. Lancez d'abord: python main.py pca-fit")
+        return versions[-1]
+    return int(setting)
+
+
+class ProjectedEmbeddings(Embeddings):
+    """Applique une projection PCA aux embeddings d'un modèle."""
+
+    def __init__(self, embeddings: Embeddings, projection: PCAProjection):
+        self.embeddings = embeddings
+        self.projection = projection
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Calculer les embeddings projetés d'une liste de documents."""
+        if not texts:
+            return []
+        return self.projection.transform(self.embeddings.embed_documents(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Calculer l'embedding projeté d'une requête."""
+        return self.projection.transform(self.embeddings.embed_query(text)).tolist()
+
+
+def exact_recall(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    reduced_corpus: np.ndarray,
+    reduced_queries: np.ndarray,
+    k: int = 5
+) -> float:
+    """Comparer le top-k exact en dimension réduite au top-k en dimension complète."""
+    def _top_k(matrix: np.ndarray, query_matrix: np.ndarray) -> np.ndarray:
+        matrix = matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+        query_matrix = query_matrix / np.clip(np.linalg.norm(query_matrix, axis=1, keepdims=True), 1e-12, None)
+        scores = query_matrix @ matrix.T
+        return np.argsort(-scores, axis=1)[:, :k]
+
+    full = _top_k(corpus, queries)
+    reduced = _top_k(reduced_corpus, reduced_queries)
+    overlaps = [len(set(a).intersection(b)) / len(a) for a, b in zip(full, reduced)]
+    return float(np.mean(overlaps))
+
+
+def fit_projection_from_index(
+    es_manager,
+    dims: int = 128,
+    sample_size: int = 5000,
+    num_queries: int = 200,
+    k: int = 5
+) -> Dict[str, Any]:
+    """Ajuster une nouvelle version de projection sur un échantillon de l'index.
+
+    Les vecteurs des chunks échantillonnés sont lus dans l'index (non projeté,
+    vérifié par l'appelant), sans réencodage; seules les requêtes, tirées d'une
+    partie des chunks, sont encodées pour mesurer le rappel@k exact avant/après
+    réduction.
+    """
+    response = es_manager.client.search(
+        index=es_manager.index_name,
+        body={
+            "query": {
+                "function_score": {
+                    "query": {"match_all": {}},
+                    "random_score": {"seed": 42, "field": "_seq_no"}
+                }
+            },
+            "_source": ["text", "vector"],
+            "size": sample_size + num_queries
+        }
+    )
+    hits = [hit["_source"] for hit in response["hits"]["hits"]]
+    corpus_hits, query_hits = hits[:sample_size], hits[sample_size:]
+    if len(query_hits) < num_queries:
+        # Petit index: prendre les requêtes parmi les chunks du corpus
+        query_hits = corpus_hits[:num_queries]
+    query_texts = [" ".join(hit["text"].split()).split(". ")[0][:200] for hit in query_hits]
+
+    corpus = np.stack([decode_vector(hit["vector"]) for hit in corpus_hits])
+    print(f"{len(corpus)} vecteurs lus dans l'index; calcul des embeddings de {len(query_texts)} requêtes...")
+    queries = np.asarray(es_manager.base_embeddings.embed_documents(query_texts), dtype=np.float32)
+
+    versions = list_versions()
+    version = versions[-1] + 1 if versions else 1
+    projection = PCAProjection.fit(corpus, dims, version, metadata={"index": es_manager.index_name})
+    recall = exact_recall(corpus, queries, projection.transform(corpus), projection.transform(queries), k=k)
+    projection.metadata[f"recall_at_{k}"] = recall
+    path = projection.save()
+
+    return {
+        "version": version,
+        "path": str(path),
+        "input_dims": projection.input_dims,
+        "output_dims": projection.output_dims,
+        "explained_variance": projection.metadata["explained_variance"],
+        "recall": recall,
+        "k": k
+    }
@@ -0,0 +1,188 @@
+import time
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+from core.indexing_pipeline import IndexingPipeline
+from utils.document_processor import SUPPORTED_EXTENSIONS
+from config.config import (
+    DOCUMENTS_DIR,
+    WATCH_DEBOUNCE_S,
+    WATCH_MAX_DELAY_S,
+    WATCH_MAX_BATCH_FILES
+)
+
+
+INDEX = "index"
+DELETE = "delete"
+DELETE_DIRECTORY = "delete_directory"
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """Transmet les événements du système de fichiers au watcher."""
+
+    def __init__(self, watcher: "DocumentWatcher"):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.record(event.src_path, INDEX)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.record(event.src_path, INDEX)
+
+    def on_deleted(self, event):
+        self.watcher.record(event.src_path, DELETE_DIRECTORY if event.is_directory else DELETE)
+
+    def on_moved(self, event):
+        # Les fichiers d'un répertoire déplacé sont signalés individuellement par watchdog
+        if not event.is_directory:
+            self.watcher.record(event.src_path, DELETE)
+            self.watcher.record(event.dest_path, INDEX)
+
+
+class DocumentWatcher:
+    """Indexation continue des documents déposés dans un répertoire.
+
+    Les événements (création, modification, suppression, déplacement) sont
+    regroupés par fichier; un lot est traité lorsque le répertoire est calme
+    depuis `debounce_s` secondes, ou au plus tard `max_delay_s` secondes après
+    le premier événement. Seuls les chunks des fichiers concernés sont mis à jour.
+    """
+
+    def __init__(
+        self,
+        pipeline: Optional[IndexingPipeline] = None,
+        directory: Union[str, Path] = DOCUMENTS_DIR,
+        debounce_s: float = WATCH_DEBOUNCE_S,
+        max_delay_s: float = WATCH_MAX_DELAY_S,
+        max_batch_files: int = WATCH_MAX_BATCH_FILES
+    ):
+        self.pipeline = pipeline or IndexingPipeline()
+        self.directory = Path(directory)
+        self.debounce_s = debounce_s
+        self.max_delay_s = max_delay_s
+        self.max_batch_files = max_batch_files
+
+        self._pending: Dict[str, str] = {}
+        self._first_event_at: Optional[float] = None
+        self._last_event_at: Optional[float] = None
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._observer = None
+        self._worker = None
+
+        self.stats = {"batches": 0, "files": 0, "indexed_chunks": 0, "deleted_chunks": 0, "errors": 0}
+
+    def record(self, path: str, action: str):
+        """Enregistrer un changement; le dernier événement d'un chemin l'emporte."""
+        if action != DELETE_DIRECTORY and Path(path).suffix.lower() not in SUPPORTED_EXTENSIONS:
+            return
+
+        with self._condition:
+            now = time.monotonic()
+            self._pending[str(Path(path))] = action
+            if self._first_event_at is None:
+                self._first_event_at = now
+            self._last_event_at = now
+            self._condition.notify()
+
+    def _next_batch(self) -> Optional[Dict[str, Any]]:
+        """Attendre la fin d'une rafale d'événements puis extraire un lot."""
+        with self._condition:
+            while not self._stop_event.is_set():
+                if not self._pending:
+                    self._condition.wait(timeout=1.0)
+                    continue
+
+                now = time.monotonic()
+                ready_at = min(self._last_event_at + self.debounce_s, self._first_event_at + self.max_delay_s)
+                if now < ready_at:
+                    self._condition.wait(timeout=ready_at - now)
+                    continue
+
+                paths = list(self._pending)[:self.max_batch_files]
+                batch = {path: self._pending.pop(path) for path in paths}
+                first_event_at = self._first_event_at
+                # Les changements restants (échéance déjà atteinte) forment le lot suivant sans attente
+                if not self._pending:
+                    self._first_event_at = None
+                return {"changes": batch, "first_event_at": first_event_at}
+
+        return None
+
+    def _process(self, batch: Dict[str, Any]):
+        """Appliquer un lot de changements à l'index."""
+        changed, deleted, deleted_directories = [], [], []
+        for path, action in batch["changes"].items():
+            if action == INDEX and Path(path).is_file():
+                changed.append(path)
+            elif action == DELETE_DIRECTORY:
+                deleted_directories.append(path)
+            else:
+                deleted.append(path)
+
+        report = self.pipeline.update_files(changed, deleted, deleted_directories)
+        latency = time.monotonic() - batch["first_event_at"]
+
+        self.stats["batches"] += 1
+        self.stats["files"] += report["files"]
+        self.stats["indexed_chunks"] += report["indexed_chunks"]
+        self.stats["deleted_chunks"] += report["deleted_chunks"]
+        self.stats["errors"] += len(report["errors"])
+
+        print(
+            f"Lot traité: {len(changed)} fichier(s) indexé(s), {len(deleted) + len(deleted_directories)} supprimé(s); "
+            f"{report['indexed_chunks']} chunks indexés, {report['deleted_chunks']} retirés, "
+            f"{latency:.1f} s après le premier événement."
+        )
+        for error in report["errors"]:
+            print(f"Fichier ignoré, nouvel essai au prochain changement: {error}")
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._process(batch)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Erreur lors de la mise à jour de l'index: {str(e)}")
+
+    def start(self):
+        """Démarrer la surveillance du répertoire."""
+        self._stop_event.clear()
+        self._worker = threading.Thread(target=self._run, name="document-watcher", daemon=True)
+        self._worker.start()
+
+        self._observer = Observer()
+        self._observer.schedule(_ChangeHandler(self), str(self.directory), recursive=True)
+        self._observer.start()
+        print(f"Surveillance de {self.directory} (anti-rebond {self.debounce_s:g} s).")
+
+    def stop(self):
+        """Arrêter la surveillance; les changements en attente ne sont pas traités."""
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._worker:
+            self._worker.join()
+
+    def run_forever(self):
+        """Surveiller le répertoire jusqu'à interruption (Ctrl+C)."""
+        self.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("Arrêt de la surveillance...")
+        finally:
+            self.stop()
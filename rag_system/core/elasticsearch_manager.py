@@ -1,33 +1,59 @@
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 
 from elasticsearch import Elasticsearch, helpers
 from elasticsearch.exceptions import RequestError
 from langchain_elasticsearch import ElasticsearchStore
 from langchain_core.documents import Document
-from langchain_community.embeddings import HuggingFaceEmbeddings
 
+from core.embeddings import create_embeddings
+from core.serialization import BulkSourceEncoder, resolve_vector_encoding, decode_vector
+from core.dimensionality_reduction import PCAProjection, ProjectedEmbeddings, resolve_version
+from utils.mmr import maximal_marginal_relevance
 from config.config import (
     ELASTICSEARCH_URL,
     ELASTICSEARCH_INDEX,
-    EMBEDDING_MODEL
+    EMBEDDING_MODEL,
+    PCA_VERSION,
+    SEARCH_MODE,
+    SEARCH_STRATEGY,
+    MMR_FETCH_K,
+    MMR_LAMBDA,
+    KNN_NUM_CANDIDATES,
+    VECTOR_INDEX_TYPE,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    INDEXING_BATCH_SIZE,
+    VECTOR_ENCODING
 )
 
 
 class ElasticsearchManager:
     """Classe pour gérer les interactions avec ElasticSearch."""
     
-    def __init__(self):
+    def __init__(self, index_name: Optional[str] = None):
         self.es_url = ELASTICSEARCH_URL
-        self.index_name = ELASTICSEARCH_INDEX
+        self.index_name = index_name or ELASTICSEARCH_INDEX
         self.client = Elasticsearch(self.es_url)
         
         # Initialiser le modèle d'embedding
-        self.embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+        self.base_embeddings = create_embeddings()
+        self.embeddings = self.base_embeddings
+        self.projection = None
         
         # Attendre que ElasticSearch soit disponible
         self._wait_for_elasticsearch()
         
+        # Encodage des vecteurs dans les requêtes bulk, selon la version du cluster
+        self.vector_encoding = resolve_vector_encoding(self.client, VECTOR_ENCODING)
+        self.last_bulk_stats = None
+        
+        # Appliquer la projection PCA de l'index (ou celle configurée pour un nouvel index)
+        self._setup_projection()
+        
+        # Dimension des vecteurs, lue depuis le modèle chargé
+        self.vector_dims = len(self.embeddings.embed_query("dimension"))
+        
         # Créer l'index s'il n'existe pas
         self._create_index_if_not_exists()
     
@@ -46,22 +72,62 @@ class ElasticsearchManager:
         
         raise ConnectionError("Impossible de se connecter à ElasticSearch après plusieurs tentatives.")
     
+    def _get_index_meta(self) -> Optional[Dict[str, Any]]:
+        """Lire les métadonnées (_meta) de l'index, ou None s'il n'existe pas."""
+        if not self.client.indices.exists(index=self.index_name):
+            return None
+        mapping = self.client.indices.get_mapping(index=self.index_name)
+        return mapping[self.index_name]["mappings"].get("_meta", {})
+    
+    def _setup_projection(self):
+        """Charger la projection PCA utilisée par l'index pour rester cohérent à la requête."""
+        index_meta = self._get_index_meta()
+        
+        if index_meta is None:
+            version = resolve_version(PCA_VERSION)
+        else:
+            version = index_meta.get("pca_version")
+            if version != resolve_version(PCA_VERSION):
+                print(
+                    f"L'index '{self.index_name}' utilise la projection PCA {version or 'aucune'}; "
+                    "elle est conservée. Supprimez l'index pour en changer."
+                )
+        
+        if version is not None:
+            self.projection = PCAProjection.load(version)
+            self.embeddings = ProjectedEmbeddings(self.base_embeddings, self.projection)
+            print(f"Projection PCA v{version} appliquée ({self.projection.output_dims} dimensions).")
+    
     def _create_index_if_not_exists(self):
         """Créer l'index ElasticSearch s'il n'existe pas déjà."""
-        if not self.client.indices.exists(index=self.index_name):
+        if self.client.indices.exists(index=self.index_name):
+            mapping = self.client.indices.get_mapping(index=self.index_name)
+            index_dims = mapping[self.index_name]["mappings"]["properties"]["vector"]["dims"]
+            if index_dims != self.vector_dims:
+                raise ValueError(
+                    f"L'index '{self.index_name}' contient des vecteurs de dimension {index_dims}, "
+                    f"mais le modèle d'embedding produit des vecteurs de dimension {self.vector_dims}. "
+                    "Supprimez l'index (python main.py clear --drop) ou changez ELASTICSEARCH_INDEX."
+                )
+        else:
             try:
                 # Définir le mapping pour stocker les embeddings
                 mapping = {
                     "mappings": {
+                        "_meta": {
+                            "embedding_model": EMBEDDING_MODEL,
+                            "pca_version": self.projection.version if self.projection else None
+                        },
                         "properties": {
                             "text": {"type": "text"},
-                            "metadata": {"type": "object"},
-                            "vector": {
-                                "type": "dense_vector",
-                                "dims": 384,  # Dimension de all-MiniLM-L6-v2
-                                "index": True,
-                                "similarity": "cosine"
-                            }
+                            "metadata": {
+                                "type": "object",
+                                "properties": {
+                                    # Signature MinHash de déduplication: stockée, ni indexée ni triable
+                                    "minhash": {"type": "keyword", "index": False, "doc_values": False}
+                                }
+                            },
+                            "vector": self.build_vector_mapping(dims=self.vector_dims)
                         }
                     }
                 }
@@ -71,62 +137,184 @@ class ElasticsearchManager:
             except RequestError as e:
                 print(f"Erreur lors de la création de l'index: {str(e)}")
     
-    def index_documents(self, documents: List[Document]) -> int:
-        """Indexer les documents dans ElasticSearch."""
+    @staticmethod
+    def build_vector_mapping(
+        dims: int,
+        index_type: str = VECTOR_INDEX_TYPE,
+        m: int = HNSW_M,
+        ef_construction: int = HNSW_EF_CONSTRUCTION
+    ) -> Dict[str, Any]:
+        """Construire le mapping du champ vectoriel avec ses paramètres HNSW."""
+        return {
+            "type": "dense_vector",
+            "dims": dims,
+            "index": True,
+            "similarity": "cosine",
+            "index_options": {
+                "type": index_type,
+                "m": m,
+                "ef_construction": ef_construction
+            }
+        }
+    
+    def index_documents(
+        self,
+        documents: List[Document],
+        batch_size: int = INDEXING_BATCH_SIZE,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        """Indexer les documents dans ElasticSearch.
+        
+        Les documents sont traités par lots; `progress_callback(indexés, total)` est
+        appelé après chaque lot et peut lever une exception pour interrompre l'indexation.
+        """
         if not documents:
             print("Aucun document à indexer.")
             return 0
         
-        actions = []
-        for i, doc in enumerate(documents):
-            # Générer l'embedding du document
-            embedding = self.embeddings.embed_query(doc.page_content)
+        total_success = 0
+        total_failed = 0
+        encoder = BulkSourceEncoder(self.vector_encoding)
+        
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
             
-            # Créer l'action d'indexation
-            action = {
-                "_index": self.index_name,
-                "_source": {
-                    "text": doc.page_content,
-                    "metadata": doc.metadata,
-                    "vector": embedding
+            # Générer les embeddings du lot, conservés en matrice float32
+            embeddings = encoder.to_float32(self.embeddings.embed_documents([doc.page_content for doc in batch]))
+            
+            actions = []
+            for doc, embedding in zip(batch, embeddings):
+                # Créer l'action d'indexation (_source déjà sérialisé)
+                action = {
+                    "_index": self.index_name,
+                    "_source": encoder.encode(doc.page_content, doc.metadata, embedding)
                 }
-            }
-            actions.append(action)
+                actions.append(action)
+            
+            # Indexer le lot
+            success, failed = helpers.bulk(self.client, actions, stats_only=True)
+            total_success += success
+            total_failed += failed
+            
+            if progress_callback:
+                progress_callback(start + len(batch), len(documents))
+        
+        print(f"Documents indexés: {total_success}, Échecs: {total_failed}")
         
-        # Indexer les documents par lots
-        success, failed = helpers.bulk(self.client, actions, stats_only=True)
-        print(f"Documents indexés: {success}, Échecs: {failed}")
+        self.last_bulk_stats = encoder.summary()
+        if self.last_bulk_stats:
+            print(
+                f"Sérialisation ({self.last_bulk_stats['serializer']}, vecteurs {self.last_bulk_stats['encoding']}): "
+                f"{self.last_bulk_stats['bytes_per_chunk']:.0f} octets/chunk, "
+                f"{self.last_bulk_stats['serialization_ms']:.1f} ms au total"
+            )
         
-        return success
+        return total_success
     
-    def search_documents(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """Rechercher des documents similaires à la requête."""
+    def search_documents(self, query: str, k: int = 5, strategy: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Rechercher des documents similaires à la requête.
+        
+        Avec la stratégie 'mmr', un ensemble élargi de candidats est récupéré puis
+        réordonné par maximal marginal relevance pour diversifier les résultats.
+        """
         # Générer l'embedding de la requête
         query_embedding = self.embeddings.embed_query(query)
         
-        # Effectuer une recherche par similarité
-        search_query = {
-            "query": {
-                "script_score": {
-                    "query": {"match_all": {}},
-                    "script": {
-                        "source": "cosineSimilarity(params.query_vector, 'vector') + 1.0",
-                        "params": {"query_vector": query_embedding}
+        strategy = (strategy or SEARCH_STRATEGY).lower()
+        if strategy == "mmr":
+            return self.mmr_search_by_vector(query_embedding, k=k)
+        elif strategy != "similarity":
+            raise ValueError(f"Stratégie de recherche non prise en charge: {strategy}")
+        
+        return self.search_by_vector(query_embedding, k=k)
+    
+    def mmr_search_by_vector(
+        self,
+        query_vector: List[float],
+        k: int = 5,
+        fetch_k: int = MMR_FETCH_K,
+        lambda_mult: float = MMR_LAMBDA
+    ) -> List[Dict[str, Any]]:
+        """Rechercher des documents pertinents et diversifiés (MMR)."""
+        candidates = self.search_by_vector(query_vector, k=max(fetch_k, k), include_vectors=True)
+        if not candidates:
+            return []
+        
+        selected = maximal_marginal_relevance(
+            query_vector,
+            [candidate["vector"] for candidate in candidates],
+            k=k,
+            lambda_mult=lambda_mult
+        )
+        
+        results = []
+        for index in selected:
+            result = dict(candidates[index])
+            del result["vector"]
+            results.append(result)
+        
+        return results
+    
+    def search_by_vector(
+        self,
+        query_vector: List[float],
+        k: int = 5,
+        mode: Optional[str] = None,
+        num_candidates: Optional[int] = None,
+        index_name: Optional[str] = None,
+        include_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Rechercher les documents les plus proches d'un vecteur.
+        
+        Le mode 'exact' parcourt tous les vecteurs avec cosineSimilarity, le mode
+        'ann' utilise l'index HNSW via une requête kNN.
+        """
+        mode = (mode or SEARCH_MODE).lower()
+        source_fields = ["text", "metadata", "vector"] if include_vectors else ["text", "metadata"]
+        
+        if mode == "ann":
+            search_query = {
+                "knn": {
+                    "field": "vector",
+                    "query_vector": query_vector,
+                    "k": k,
+                    "num_candidates": max(num_candidates or KNN_NUM_CANDIDATES, k)
+                },
+                "_source": source_fields,
+                "size": k
+            }
+        elif mode == "exact":
+            # Effectuer une recherche par similarité exacte
+            search_query = {
+                "query": {
+                    "script_score": {
+                        "query": {"match_all": {}},
+                        "script": {
+                            "source": "cosineSimilarity(params.query_vector, 'vector') + 1.0",
+                            "params": {"query_vector": query_vector}
+                        }
                     }
-                }
-            },
-            "size": k
-        }
+                },
+                "_source": source_fields,
+                "size": k
+            }
+        else:
+            raise ValueError(f"Mode de recherche non pris en charge: {mode}")
         
-        response = self.client.search(index=self.index_name, body=search_query)
+        response = self.client.search(index=index_name or self.index_name, body=search_query)
         
         results = []
         for hit in response["hits"]["hits"]:
-            results.append({
+            result = {
+                "id": hit["_id"],
                 "text": hit["_source"]["text"],
                 "metadata": hit["_source"]["metadata"],
                 "score": hit["_score"]
-            })
+            }
+            if include_vectors:
+                # Les vecteurs peuvent être stockés en base64 (VECTOR_ENCODING)
+                result["vector"] = decode_vector(hit["_source"]["vector"])
+            results.append(result)
         
         return results
     
@@ -139,12 +327,140 @@ class ElasticsearchManager:
             query_field="text"
         ).as_retriever(search_kwargs={"k": k})
     
+    def _scan_chunk_metadata(self, field: str, values: List[str], source_fields: List[str]):
+        """Parcourir les chunks dont le champ de métadonnées `field` contient l'une des valeurs."""
+        values = list(set(values))
+        for start in range(0, len(values), 1000):
+            batch = values[start:start + 1000]
+            try:
+                for hit in helpers.scan(
+                    self.client,
+                    index=self.index_name,
+                    query={
+                        "query": {"terms": {f"metadata.{field}.keyword": batch}},
+                        "_source": [f"metadata.{name}" for name in ["source", "sources"] + source_fields]
+                    }
+                ):
+                    yield hit["_id"], hit["_source"]["metadata"]
+            except Exception as e:
+                print(f"Erreur lors de la recherche des doublons: {str(e)}")
+    
+    def find_existing_chunks(self, content_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Retrouver les chunks déjà indexés ayant ces hashes de contenu.
+        
+        Retourne, pour chaque hash trouvé, l'identifiant du chunk et ses sources.
+        """
+        existing = {}
+        for chunk_id, metadata in self._scan_chunk_metadata("content_hash", content_hashes, ["content_hash"]):
+            existing[metadata["content_hash"]] = {
+                "id": chunk_id,
+                "sources": metadata.get("sources") or [metadata.get("source")]
+            }
+        return existing
+    
+    def find_similar_chunks(self, band_keys: List[str]) -> List[Dict[str, Any]]:
+        """Retrouver les chunks indexés partageant au moins une clé LSH (candidats quasi-doublons).
+        
+        Retourne l'identifiant, les sources, la signature MinHash et les clés de chaque chunk.
+        """
+        return [
+            {
+                "id": chunk_id,
+                "sources": metadata.get("sources") or [metadata.get("source")],
+                "minhash": metadata["minhash"],
+                "minhash_bands": metadata.get("minhash_bands", [])
+            }
+            for chunk_id, metadata in self._scan_chunk_metadata("minhash_bands", band_keys, ["minhash", "minhash_bands"])
+            if "minhash" in metadata
+        ]
+    
+    def add_chunk_sources(self, new_sources: Dict[str, List[str]]):
+        """Ajouter des sources à des chunks déjà indexés (doublons d'autres fichiers)."""
+        actions = [
+            {
+                "_op_type": "update",
+                "_index": self.index_name,
+                "_id": chunk_id,
+                "script": {
+                    "source": (
+                        "if (ctx._source.metadata.sources == null) {"
+                        "  ctx._source.metadata.sources = [ctx._source.metadata.source];"
+                        "}"
+                        "for (s in params.sources) {"
+                        "  if (!ctx._source.metadata.sources.contains(s)) { ctx._source.metadata.sources.add(s); }"
+                        "}"
+                    ),
+                    "params": {"sources": sources}
+                }
+            }
+            for chunk_id, sources in new_sources.items()
+        ]
+        if actions:
+            helpers.bulk(self.client, actions, raise_on_error=False)
+    
+    def delete_documents_by_source(self, sources: List[str] = None, prefixes: List[str] = None) -> int:
+        """Retirer les sources données (fichiers ou répertoires) des chunks indexés.
+        
+        Un chunk partagé avec d'autres sources (doublon retiré à l'indexation)
+        est conservé pour celles-ci; il n'est supprimé que s'il ne lui en reste
+        aucune. L'index est rafraîchi pour que les chunks supprimés ne soient
+        plus vus par la déduplication lors de la réindexation qui suit.
+        """
+        sources = list(sources or [])
+        prefixes = list(prefixes or [])
+        clauses = []
+        for field in ("metadata.source.keyword", "metadata.sources.keyword"):
+            if sources:
+                clauses.append({"terms": {field: sources}})
+            for prefix in prefixes:
+                clauses.append({"prefix": {field: prefix}})
+        if not clauses:
+            return 0
+        
+        try:
+            response = self.client.update_by_query(
+                index=self.index_name,
+                body={
+                    "query": {"bool": {"should": clauses, "minimum_should_match": 1}},
+                    "script": {
+                        "source": (
+                            "def current = ctx._source.metadata.sources != null"
+                            "  ? ctx._source.metadata.sources : [ctx._source.metadata.source];"
+                            "def remaining = new ArrayList();"
+                            "for (s in current) {"
+                            "  boolean removed = params.sources.contains(s);"
+                            "  for (p in params.prefixes) { if (s != null && s.startsWith(p)) { removed = true; } }"
+                            "  if (!removed) { remaining.add(s); }"
+                            "}"
+                            "if (remaining.isEmpty()) {"
+                            "  ctx.op = 'delete';"
+                            "} else {"
+                            "  ctx._source.metadata.sources = remaining;"
+                            "  if (!remaining.contains(ctx._source.metadata.source)) {"
+                            "    ctx._source.metadata.source = remaining.get(0);"
+                            "  }"
+                            "}"
+                        ),
+                        "params": {"sources": sources, "prefixes": prefixes}
+                    }
+                },
+                refresh=True,
+                conflicts="proceed"
+            )
+            return response["deleted"]
+        except Exception as e:
+            print(f"Erreur lors de la suppression des chunks par source: {str(e)}")
+            return 0
+    
     def delete_all_documents(self):
         """Supprimer tous les documents de l'index."""
         try:
+            # Rafraîchir pour qu'une réindexation immédiate ne voie plus les chunks supprimés
             self.client.delete_by_query(
                 index=self.index_name,
-                body={"query": {"match_all": {}}}
+                body={"query": {"match_all": {}}},
+                refresh=True,
+                conflicts="proceed"
             )
             print(f"Tous les documents de l'index '{self.index_name}' ont été supprimés.")
         except Exception as e:
@@ -0,0 +1,245 @@
+import json
+import time
+import queue
+import itertools
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Callable, Optional
+
+import requests
+from langchain_core.embeddings import Embeddings
+
+from config.config import EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_WAIT_MS
+
+
+# Les requêtes interactives passent avant les lots de documents en attente
+PRIORITY_QUERY = 0
+PRIORITY_DOCUMENTS = 1
+_PRIORITY_STOP = 2
+
+
+class EmbeddingBatcher(Embeddings):
+    """Worker d'embedding partagé qui regroupe les requêtes en micro-lots.
+
+    Les appelants déposent leurs textes dans une file; un thread unique les
+    regroupe (au plus `max_batch_size` textes, en attendant au plus `max_wait_ms`)
+    et effectue une seule passe du modèle par lot. Les listes de documents sont
+    découpées en morceaux de `max_batch_size` textes et les requêtes sont servies
+    en priorité, pour ne pas attendre derrière une indexation. Suppose que le
+    modèle encapsulé calcule les requêtes et les documents de la même façon.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_size: int = EMBEDDING_BATCH_SIZE,
+        max_wait_ms: float = EMBEDDING_MAX_WAIT_MS
+    ):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "texts": 0,
+            "batches": 0,
+            "largest_batch": 0,
+            "total_wait_ms": 0.0,
+            "max_queue_depth": 0
+        }
+
+        self._thread = threading.Thread(target=self._run, name="embedding-worker", daemon=True)
+        self._thread.start()
+
+    def _put(self, priority: int, item):
+        self._queue.put((priority, next(self._sequence), item))
+
+    def _submit(self, texts: List[str], priority: int = PRIORITY_DOCUMENTS) -> Future:
+        """Déposer des textes dans la file et obtenir le futur de leurs embeddings."""
+        future = Future()
+        self._put(priority, (texts, future, time.perf_counter()))
+
+        with self._stats_lock:
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queue.qsize())
+
+        return future
+
+    def _collect_batch(self, first) -> List:
+        """Regrouper les requêtes en attente jusqu'à la taille ou au délai maximal."""
+        pending = [first]
+        num_texts = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+
+        while num_texts < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            item = entry[2]
+            if item is None or num_texts + len(item[0]) > self.max_batch_size:
+                # Remettre l'entrée (signal d'arrêt ou morceau trop grand) pour le lot suivant
+                self._queue.put(entry)
+                break
+            pending.append(item)
+            num_texts += len(item[0])
+
+        return pending
+
+    def _run(self):
+        """Boucle du worker: former les lots et calculer les embeddings."""
+        while True:
+            first = self._queue.get()[2]
+            if first is None:
+                return
+
+            pending = self._collect_batch(first)
+            texts = [text for item in pending for text in item[0]]
+            started = time.perf_counter()
+
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+            except Exception as e:
+                for _, future, _ in pending:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_texts, future, _ in pending:
+                future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+            with self._stats_lock:
+                self._stats["requests"] += len(pending)
+                self._stats["texts"] += len(texts)
+                self._stats["batches"] += 1
+                self._stats["largest_batch"] = max(self._stats["largest_batch"], len(texts))
+                self._stats["total_wait_ms"] += sum((started - submitted) * 1000 for _, _, submitted in pending)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Calculer les embeddings d'une liste de documents via le worker."""
+        texts = list(texts)
+        futures = [
+            self._submit(texts[start:start + self.max_batch_size])
+            for start in range(0, len(texts), self.max_batch_size)
+        ]
+        return [vector for future in futures for vector in future.result()]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Calculer l'embedding d'une requête via le worker (file prioritaire)."""
+        return self._submit([text], priority=PRIORITY_QUERY).result()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Obtenir les statistiques de la file et des lots."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_batch_size"] = stats["texts"] / stats["batches"] if stats["batches"] else 0.0
+        stats["avg_wait_ms"] = stats.pop("total_wait_ms") / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+    def close(self):
+        """Arrêter le worker après le traitement des requêtes en attente."""
+        self._put(_PRIORITY_STOP, None)
+        self._thread.join()
+
+
+_shared_batcher: Optional[EmbeddingBatcher] = None
+_shared_batcher_lock = threading.Lock()
+
+
+def get_shared_batcher(factory: Callable[[], Embeddings]) -> EmbeddingBatcher:
+    """Obtenir le worker partagé par tous les services du processus."""
+    global _shared_batcher
+
+    with _shared_batcher_lock:
+        if _shared_batcher is None:
+            _shared_batcher = EmbeddingBatcher(factory())
+        return _shared_batcher
+
+
+class RemoteEmbeddings(Embeddings):
+    """Client du worker d'embedding exécuté en sidecar (`python main.py embedding-worker`)."""
+
+    def __init__(self, url: str, timeout: float = 60):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Calculer les embeddings d'une liste de documents via le sidecar."""
+        if not texts:
+            return []
+        response = self.session.post(f"{self.url}/embed", json={"texts": texts}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["embeddings"]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Calculer l'embedding d'une requête via le sidecar (file prioritaire)."""
+        response = self.session.post(
+            f"{self.url}/embed", json={"texts": [text], "query": True}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()["embeddings"][0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Obtenir les statistiques du sidecar."""
+        response = self.session.get(f"{self.url}/stats", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+def serve_embedding_worker(batcher: EmbeddingBatcher, host: str = "127.0.0.1", port: int = 8765):
+    """Exposer un worker d'embedding en HTTP (POST /embed, GET /stats)."""
+
+    class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: Dict[str, Any]):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path != "/embed":
+                self._send_json(404, {"error": "Route inconnue"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+                if payload.get("query"):
+                    embeddings = [batcher.embed_query(text) for text in payload["texts"]]
+                else:
+                    embeddings = batcher.embed_documents(payload["texts"])
+                self._send_json(200, {"embeddings": embeddings})
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send_json(200, batcher.stats())
+            else:
+                self._send_json(404, {"error": "Route inconnue"})
+
+        def log_message(self, format, *args):
+            # Éviter une ligne de log par requête
+            pass
+
+    server = ThreadingHTTPServer((host, port), EmbeddingRequestHandler)
+    print(f"Worker d'embedding à l'écoute sur http://{host}:{port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
@@ -0,0 +1,260 @@
+import json
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    ONNX_MODEL_DIR,
+    ONNX_QUANTIZE,
+    EMBEDDING_NUM_THREADS,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_WORKER,
+    EMBEDDING_WORKER_URL
+)
+
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+
+
+def _resolve_hub_model_name(model_name: str) -> str:
+    """Obtenir l'identifiant complet du modèle, comme le fait sentence-transformers."""
+    if "/" in model_name or Path(model_name).exists():
+        return model_name
+    return f"sentence-transformers/{model_name}"
+
+
+def _read_json(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resolve_max_length(model_dir: Union[str, Path]) -> int:
+    """Longueur maximale de séquence du modèle exporté.
+
+    Comme sentence-transformers, on utilise `max_seq_length` de
+    `sentence_bert_config.json`; à défaut, la limite du tokenizer, bornée par
+    le nombre de positions du modèle.
+    """
+    model_dir = Path(model_dir)
+    max_seq_length = _read_json(model_dir / "sentence_bert_config.json").get("max_seq_length")
+    if max_seq_length:
+        return int(max_seq_length)
+
+    limits = [
+        _read_json(model_dir / "tokenizer_config.json").get("model_max_length"),
+        _read_json(model_dir / "config.json").get("max_position_embeddings")
+    ]
+    # Les tokenizers sans limite déclarent une valeur sentinelle très grande
+    limits = [int(limit) for limit in limits if limit and limit < 100_000]
+    return min(limits) if limits else 512
+
+
+class ONNXEmbeddings(Embeddings):
+    """Embeddings calculés avec ONNX Runtime sur CPU, sans PyTorch.
+
+    Reproduit le pipeline sentence-transformers (mean pooling puis normalisation L2)
+    à partir d'un modèle exporté par `export_onnx_model`.
+    """
+
+    def __init__(
+        self,
+        model_dir: Union[str, Path] = ONNX_MODEL_DIR,
+        quantized: bool = ONNX_QUANTIZE,
+        num_threads: int = EMBEDDING_NUM_THREADS,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        max_length: Optional[int] = None,
+        normalize: bool = True
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        model_file = model_dir / (ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+
+        if not model_file.exists():
+            raise FileNotFoundError(
+                f"Le modèle ONNX {model_file} n'existe pas. "
+                "Exportez-le d'abord avec: python main.py onnx-export"
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(
+            str(model_file), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.max_length = max_length or resolve_max_length(model_dir)
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+        # Le tokenizer exporté peut imposer une longueur fixe: chaque lot est complété à sa plus longue séquence
+        padding = self.tokenizer.padding or {}
+        self.tokenizer.enable_padding(
+            pad_id=padding.get("pad_id", 0),
+            pad_type_id=padding.get("pad_type_id", 0),
+            pad_token=padding.get("pad_token", "[PAD]")
+        )
+
+        self.batch_size = batch_size
+        self.normalize = normalize
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Calculer les embeddings d'un lot de textes."""
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling sur les tokens réels (hors padding)
+        mask = attention_mask[..., np.newaxis].astype(np.float32)
+        embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.normalize:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+        return embeddings.astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Calculer les embeddings d'une liste de documents par lots."""
+        embeddings = []
+        for start in range(0, len(texts), self.batch_size):
+            embeddings.extend(self._embed_batch(texts[start:start + self.batch_size]).tolist())
+        return embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        """Calculer l'embedding d'une requête."""
+        return self._embed_batch([text])[0].tolist()
+
+
+def create_embeddings(backend: Optional[str] = None, worker: Optional[str] = None) -> Embeddings:
+    """Créer le modèle d'embedding selon le backend et le mode de worker configurés.
+
+    Avec le worker 'inprocess', tous les services du processus partagent un même
+    modèle derrière une file de micro-lots; avec 'sidecar', les embeddings sont
+    délégués au worker HTTP local.
+    """
+    worker = (worker or EMBEDDING_WORKER).lower()
+
+    if worker == "sidecar":
+        from core.embedding_worker import RemoteEmbeddings
+        return RemoteEmbeddings(EMBEDDING_WORKER_URL)
+    elif worker == "inprocess":
+        from core.embedding_worker import get_shared_batcher
+        return get_shared_batcher(lambda: create_embeddings(backend=backend, worker="none"))
+    elif worker != "none":
+        raise ValueError(f"Mode de worker d'embedding non pris en charge: {worker}")
+
+    backend = (backend or EMBEDDING_BACKEND).lower()
+
+    if backend == "onnx":
+        return ONNXEmbeddings()
+    elif backend == "huggingface":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL,
+            encode_kwargs={"batch_size": EMBEDDING_BATCH_SIZE}
+        )
+    else:
+        raise ValueError(f"Backend d'embedding non pris en charge: {backend}")
+
+
+def export_onnx_model(
+    model_name: str = EMBEDDING_MODEL,
+    output_dir: Union[str, Path] = ONNX_MODEL_DIR,
+    quantize: bool = True
+) -> Path:
+    """Exporter le modèle d'embedding au format ONNX, avec une variante int8 optionnelle.
+
+    L'export nécessite optimum et PyTorch; l'inférence ensuite n'utilise que ONNX Runtime.
+    """
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from transformers import AutoTokenizer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    hub_model_name = _resolve_hub_model_name(model_name)
+
+    print(f"Export du modèle {hub_model_name} vers {output_dir}...")
+    model = ORTModelForFeatureExtraction.from_pretrained(hub_model_name, export=True)
+    model.save_pretrained(output_dir)
+    AutoTokenizer.from_pretrained(hub_model_name).save_pretrained(output_dir)
+
+    # Longueur de troncature utilisée par sentence-transformers, reprise par ONNXEmbeddings
+    try:
+        config_path = Path(hub_model_name) / "sentence_bert_config.json"
+        if not config_path.exists():
+            from huggingface_hub import hf_hub_download
+            config_path = Path(hf_hub_download(hub_model_name, "sentence_bert_config.json"))
+        (output_dir / config_path.name).write_bytes(config_path.read_bytes())
+    except Exception as e:
+        print(f"sentence_bert_config.json indisponible, limite du tokenizer utilisée: {str(e)}")
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        print("Quantification dynamique int8...")
+        quantize_dynamic(
+            str(output_dir / ONNX_MODEL_FILE),
+            str(output_dir / ONNX_QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8
+        )
+
+    return output_dir
+
+
+def _row_cosines(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def compare_embeddings(reference: Embeddings, candidate: Embeddings, texts: List[str]) -> Dict[str, Any]:
+    """Comparer deux modèles d'embedding (similarité cosinus et latence par requête).
+
+    Les textes sont aussi encodés en un seul lot avec `embed_documents`, pour
+    vérifier le padding de séquences de longueurs différentes.
+    """
+    def _timed_queries(embeddings: Embeddings) -> Dict[str, Any]:
+        vectors = []
+        latencies = []
+        for text in texts:
+            start = time.perf_counter()
+            vectors.append(embeddings.embed_query(text))
+            latencies.append((time.perf_counter() - start) * 1000)
+        return {"vectors": np.array(vectors, dtype=np.float32), "latencies": latencies}
+
+    # Premier appel hors mesure pour charger les poids
+    reference.embed_query(texts[0])
+    candidate.embed_query(texts[0])
+
+    reference_run = _timed_queries(reference)
+    candidate_run = _timed_queries(candidate)
+
+    cosines = _row_cosines(reference_run["vectors"], candidate_run["vectors"])
+    document_cosines = _row_cosines(
+        np.array(reference.embed_documents(texts), dtype=np.float32),
+        np.array(candidate.embed_documents(texts), dtype=np.float32)
+    )
+
+    return {
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "documents_min_cosine": float(document_cosines.min()),
+        "reference_ms": float(np.median(reference_run["latencies"])),
+        "candidate_ms": float(np.median(candidate_run["latencies"]))
+    }
@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import uuid
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Union
+
+from core.indexing_pipeline import IndexingPipeline, IndexingCancelled
+from config.config import DOCUMENTS_DIR, JOBS_DIR, INDEXING_WORKERS
+
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+COMPLETED_WITH_ERRORS = "completed_with_errors"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (COMPLETED, COMPLETED_WITH_ERRORS, FAILED, CANCELLED)
+
+
+class IndexingJob:
+    """Tâche d'indexation exécutée en arrière-plan."""
+
+    def __init__(self, kind: str, file_paths: List[Path], clear_index: bool = False):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.file_paths = file_paths
+        self.clear_index = clear_index
+        self.status = PENDING
+        self.files_total = len(file_paths)
+        self.files_done = 0
+        self.chunks_total = 0
+        self.chunks_done = 0
+        self.current_file = None
+        self.error = None
+        self.failed_files = []
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.persist_lock = threading.Lock()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Obtenir l'état de la tâche sous forme de dictionnaire sérialisable."""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "files": [str(file_path) for file_path in self.file_paths],
+            "files_total": self.files_total,
+            "files_done": self.files_done,
+            "chunks_total": self.chunks_total,
+            "chunks_done": self.chunks_done,
+            "current_file": self.current_file,
+            "error": self.error,
+            "failed_files": self.failed_files,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class IndexingJobManager:
+    """File de tâches d'indexation exécutées par un pool de workers.
+
+    L'état de chaque tâche est persisté en JSON dans `JOBS_DIR`, ce qui permet à
+    l'interface de suivre sa progression sans bloquer la session. Une
+    réindexation, qui vide l'index, s'exécute seule: elle attend la fin des
+    tâches en cours et les suivantes attendent la sienne.
+    """
+
+    def __init__(
+        self,
+        pipeline: Optional[IndexingPipeline] = None,
+        max_workers: int = INDEXING_WORKERS,
+        jobs_dir: Union[str, Path] = JOBS_DIR
+    ):
+        self.pipeline = pipeline or IndexingPipeline()
+        self.jobs_dir = Path(jobs_dir)
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="indexing-job")
+        self.jobs: Dict[str, IndexingJob] = {}
+        self.lock = threading.Lock()
+
+        # Accès à l'index: partagé entre tâches de fichiers, exclusif pour les réindexations
+        self._index_access = threading.Condition()
+        self._shared_jobs = 0
+        self._exclusive_running = False
+        self._exclusive_waiting = 0
+
+        self._recover_interrupted_jobs()
+
+    def _job_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _persist(self, job: IndexingJob):
+        """Écrire l'état de la tâche de façon atomique.
+
+        Le worker et `cancel()` peuvent écrire la même tâche en même temps: les
+        écritures d'une tâche sont sérialisées.
+        """
+        path = self._job_path(job.id)
+        tmp_path = path.with_suffix(".json.tmp")
+        with job.persist_lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(job.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    @contextmanager
+    def _index_lock(self, exclusive: bool):
+        """Réserver l'accès à l'index; les réindexations en attente passent avant les nouvelles tâches."""
+        with self._index_access:
+            if exclusive:
+                self._exclusive_waiting += 1
+                while self._exclusive_running or self._shared_jobs:
+                    self._index_access.wait()
+                self._exclusive_waiting -= 1
+                self._exclusive_running = True
+            else:
+                while self._exclusive_running or self._exclusive_waiting:
+                    self._index_access.wait()
+                self._shared_jobs += 1
+        try:
+            yield
+        finally:
+            with self._index_access:
+                if exclusive:
+                    self._exclusive_running = False
+                else:
+                    self._shared_jobs -= 1
+                self._index_access.notify_all()
+
+    def _recover_interrupted_jobs(self):
+        """Marquer en échec les tâches laissées en cours par un arrêt du processus."""
+        for path in self.jobs_dir.glob("*.json"):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                if state["status"] not in FINISHED_STATUSES:
+                    state["status"] = FAILED
+                    state["error"] = "Tâche interrompue par l'arrêt du processus."
+                    with open(path, "w", encoding="utf-8") as f:
+                        json.dump(state, f, ensure_ascii=False)
+            except Exception as e:
+                print(f"Erreur lors de la lecture de la tâche {path.name}: {str(e)}")
+
+    def _submit(self, job: IndexingJob) -> str:
+        with self.lock:
+            self.jobs[job.id] = job
+        self._persist(job)
+        self.executor.submit(self._run, job)
+        print(f"Tâche d'indexation {job.id} soumise ({job.files_total} fichier(s)).")
+        return job.id
+
+    def submit_files(self, file_paths: List[Union[str, Path]]) -> str:
+        """Soumettre l'indexation d'une liste de fichiers."""
+        return self._submit(IndexingJob("files", [Path(file_path) for file_path in file_paths]))
+
+    def submit_upload(self, uploaded_file, save_dir: Union[str, Path] = None) -> str:
+        """Sauvegarder un fichier téléchargé et soumettre son indexation."""
+        file_path = self.pipeline.save_file(uploaded_file, save_dir)
+        return self._submit(IndexingJob("upload", [file_path]))
+
+    def submit_reindex(self, directory_path: Union[str, Path] = None) -> str:
+        """Soumettre la réindexation complète d'un répertoire (l'index est vidé au démarrage)."""
+        file_paths = self.pipeline.document_processor.list_supported_files(directory_path or DOCUMENTS_DIR)
+        return self._submit(IndexingJob("reindex", file_paths, clear_index=True))
+
+    def _run(self, job: IndexingJob):
+        """Exécuter une tâche d'indexation dans un worker, avec l'accès à l'index qu'elle requiert."""
+        with self._index_lock(exclusive=job.clear_index):
+            self._execute(job)
+
+    def _execute(self, job: IndexingJob):
+        if job.cancel_event.is_set():
+            return
+
+        job.status = RUNNING
+        job.started_at = time.time()
+        self._persist(job)
+
+        chunks_before_file = 0
+
+        def on_progress(chunks_done: int, chunks_total: int):
+            job.chunks_done = chunks_before_file + chunks_done
+            job.chunks_total = max(job.chunks_total, chunks_before_file + chunks_total)
+            self._persist(job)
+            if job.cancel_event.is_set():
+                raise IndexingCancelled()
+
+        try:
+            if job.clear_index:
+                self.pipeline.clear_index()
+
+            for file_path in job.file_paths:
+                if job.cancel_event.is_set():
+                    raise IndexingCancelled()
+
+                job.current_file = file_path.name
+                self._persist(job)
+
+                try:
+                    self.pipeline.index_file(file_path, progress_callback=on_progress, raise_errors=True)
+                except IndexingCancelled:
+                    raise
+                except Exception as e:
+                    # Continuer avec les autres fichiers; l'échec est conservé dans l'état de la tâche
+                    job.failed_files.append({"file": file_path.name, "error": str(e)})
+                    print(f"Erreur lors du traitement du fichier {file_path.name}: {str(e)}")
+
+                chunks_before_file = job.chunks_done
+                job.files_done += 1
+
+            if not job.failed_files:
+                job.status = COMPLETED
+            elif len(job.failed_files) == len(job.file_paths):
+                job.status = FAILED
+                job.error = "Aucun fichier n'a pu être indexé."
+            else:
+                job.status = COMPLETED_WITH_ERRORS
+                job.error = f"{len(job.failed_files)}/{len(job.file_paths)} fichiers n'ont pas pu être indexés."
+        except IndexingCancelled:
+            job.status = CANCELLED
+            print(f"Tâche d'indexation {job.id} annulée.")
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            print(f"Erreur lors de la tâche d'indexation {job.id}: {str(e)}")
+        finally:
+            job.current_file = None
+            job.finished_at = time.time()
+            self._persist(job)
+
+    def cancel(self, job_id: str) -> bool:
+        """Demander l'annulation d'une tâche (prise en compte entre deux lots)."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+
+        if job is None or job.status in FINISHED_STATUSES:
+            return False
+
+        job.cancel_event.set()
+        if job.status == PENDING:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            self._persist(job)
+        return True
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Obtenir l'état d'une tâche, y compris celles d'une exécution précédente."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+
+        path = self._job_path(job_id)
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return None
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Lister les tâches les plus récentes."""
+        jobs = []
+        for path in self.jobs_dir.glob("*.json"):
+            job = self.get_job(path.stem)
+            if job:
+                jobs.append(job)
+        return sorted(jobs, key=lambda job: job["created_at"], reverse=True)[:limit]
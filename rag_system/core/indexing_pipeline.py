@@ -1,41 +1,178 @@
 import os
-from typing import List, Dict, Any, Optional, Union
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Union, Callable, Tuple
 from pathlib import Path
 
 from langchain_core.documents import Document
 
 from utils.document_processor import DocumentProcessor
+from utils.deduplication import ChunkDeduplicator
 from core.elasticsearch_manager import ElasticsearchManager
-from config.config import DOCUMENTS_DIR
+from config.config import DOCUMENTS_DIR, DEDUP_ENABLED
+
+
+class IndexingCancelled(Exception):
+    """Levée par un callback de progression pour interrompre l'indexation."""
 
 
 class IndexingPipeline:
     """Pipeline pour traiter et indexer des documents dans ElasticSearch."""
     
-    def __init__(self):
+    def __init__(self, es_manager: Optional[ElasticsearchManager] = None):
         self.document_processor = DocumentProcessor()
-        self.es_manager = ElasticsearchManager()
+        self.es_manager = es_manager or ElasticsearchManager()
+        self.deduplicator = ChunkDeduplicator() if DEDUP_ENABLED else None
+        self.dedup_stats = {"input_chunks": 0, "removed_chunks": 0, "bytes_saved": 0}
+    
+    def _find_indexed_duplicates(self, documents: List[Document]) -> List[Tuple[Document, Dict[str, Any]]]:
+        """Associer aux chunks déjà indexés les doublons exacts et quasi exacts du lot.
+        
+        Les quasi-doublons sont cherchés par les clés LSH stockées à l'indexation,
+        ce qui couvre les fichiers indexés séparément (tâches, téléversements, watch).
+        """
+        matches = []
+        existing = self.es_manager.find_existing_chunks([doc.metadata["content_hash"] for doc in documents])
+        remaining = []
+        for doc in documents:
+            if doc.metadata["content_hash"] in existing:
+                matches.append((doc, existing[doc.metadata["content_hash"]]))
+            else:
+                remaining.append(doc)
+        
+        candidates_by_band = defaultdict(list)
+        for chunk in self.es_manager.find_similar_chunks(
+            [key for doc in remaining for key in doc.metadata.get("minhash_bands", [])]
+        ):
+            for key in chunk["minhash_bands"]:
+                candidates_by_band[key].append(chunk)
+        
+        for doc in remaining:
+            if "minhash" not in doc.metadata:
+                continue
+            signature = self.deduplicator.decode_signature(doc.metadata["minhash"])
+            match = next(
+                (
+                    chunk
+                    for key in doc.metadata["minhash_bands"]
+                    for chunk in candidates_by_band.get(key, ())
+                    if self.deduplicator.is_near_duplicate(
+                        signature, self.deduplicator.decode_signature(chunk["minhash"])
+                    )
+                ),
+                None
+            )
+            if match is not None:
+                matches.append((doc, match))
+        
+        return matches
+    
+    def deduplicate(self, documents: List[Document]) -> List[Document]:
+        """Retirer les chunks dupliqués du lot et ceux déjà présents dans l'index."""
+        if not self.deduplicator or not documents:
+            return documents
+        
+        kept, report = self.deduplicator.deduplicate(documents)
+        
+        # Doublons de chunks déjà indexés: le chunk existant est conservé et reçoit
+        # les sources du nouveau, pour survivre à la suppression de l'une d'elles
+        indexed_duplicates = self._find_indexed_duplicates(kept)
+        duplicate_ids = {id(doc) for doc, _ in indexed_duplicates}
+        kept = [doc for doc in kept if id(doc) not in duplicate_ids]
+        
+        new_sources = {}
+        for doc, chunk in indexed_duplicates:
+            missing = [source for source in doc.metadata["sources"] if source not in chunk["sources"]]
+            if missing:
+                chunk["sources"].extend(missing)
+                new_sources.setdefault(chunk["id"], []).extend(missing)
+        self.es_manager.add_chunk_sources(new_sources)
+        
+        removed = len(documents) - len(kept)
+        text_bytes_saved = report["bytes_saved"] + sum(
+            len(doc.page_content.encode("utf-8")) for doc, _ in indexed_duplicates
+        )
+        bytes_saved = text_bytes_saved + removed * self.es_manager.vector_dims * 4
+        
+        self.dedup_stats["input_chunks"] += len(documents)
+        self.dedup_stats["removed_chunks"] += removed
+        self.dedup_stats["bytes_saved"] += bytes_saved
+        
+        if removed:
+            print(
+                f"Déduplication: {removed}/{len(documents)} chunks retirés "
+                f"({report['exact_duplicates']} exacts, {report['near_duplicates']} quasi-doublons, "
+                f"{len(indexed_duplicates)} déjà indexés), ~{bytes_saved / 1024:.1f} Ko économisés."
+            )
+        
+        return kept
     
-    def index_file(self, file_path: Union[str, Path]) -> int:
-        """Traiter et indexer un fichier unique."""
+    def index_file(
+        self,
+        file_path: Union[str, Path],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        raise_errors: bool = False
+    ) -> int:
+        """Traiter et indexer un fichier unique.
+        
+        Avec `raise_errors`, les erreurs de traitement sont propagées à l'appelant
+        (tâches d'indexation) au lieu d'être affichées.
+        """
         file_path = Path(file_path)
         
         print(f"Traitement du fichier: {file_path.name}")
         
         try:
             # Traiter le document
-            documents = self.document_processor.load_document(file_path)
+            documents = self.deduplicate(self.document_processor.load_document(file_path))
             
             # Indexer les documents
-            num_indexed = self.es_manager.index_documents(documents)
+            num_indexed = self.es_manager.index_documents(documents, progress_callback=progress_callback)
             
             print(f"Fichier {file_path.name} traité avec succès. {num_indexed} chunks indexés.")
             return num_indexed
             
+        except IndexingCancelled:
+            raise
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Erreur lors du traitement du fichier {file_path.name}: {str(e)}")
             return 0
     
+    def update_files(
+        self,
+        changed_paths: List[Union[str, Path]] = (),
+        deleted_paths: List[Union[str, Path]] = (),
+        deleted_directories: List[Union[str, Path]] = ()
+    ) -> Dict[str, Any]:
+        """Mettre à jour l'index pour un lot de fichiers modifiés ou supprimés.
+        
+        Les fichiers modifiés sont chargés avant de supprimer leurs anciens chunks,
+        puis tous les nouveaux chunks du lot sont indexés ensemble.
+        """
+        report = {"files": 0, "deleted_chunks": 0, "indexed_chunks": 0, "errors": []}
+        
+        documents = []
+        loaded_sources = []
+        for file_path in map(Path, changed_paths):
+            try:
+                documents.extend(self.document_processor.load_document(file_path))
+                loaded_sources.append(str(file_path))
+            except Exception as e:
+                # Fichier illisible (écriture en cours, format invalide): on garde l'ancienne version
+                report["errors"].append(f"{file_path.name}: {str(e)}")
+        
+        report["files"] = len(loaded_sources) + len(deleted_paths)
+        report["deleted_chunks"] = self.es_manager.delete_documents_by_source(
+            sources=loaded_sources + [str(Path(path)) for path in deleted_paths],
+            prefixes=[os.path.join(str(Path(path)), "") for path in deleted_directories]
+        )
+        
+        if documents:
+            report["indexed_chunks"] = self.es_manager.index_documents(self.deduplicate(documents))
+        
+        return report
+    
     def index_directory(self, directory_path: Union[str, Path] = None) -> int:
         """Traiter et indexer tous les documents d'un répertoire."""
         if directory_path is None:
@@ -47,7 +184,7 @@ class IndexingPipeline:
         
         try:
             # Traiter tous les documents du répertoire
-            documents = self.document_processor.process_directory(directory_path)
+            documents = self.deduplicate(self.document_processor.process_directory(directory_path))
             
             # Indexer les documents
             num_indexed = self.es_manager.index_documents(documents)
@@ -67,23 +204,28 @@ class IndexingPipeline:
         """Obtenir le nombre de documents indexés."""
         return self.es_manager.get_document_count()
     
-    def save_uploaded_file(self, uploaded_file, save_dir: Union[str, Path] = None) -> Optional[Path]:
-        """Sauvegarder un fichier téléchargé et l'indexer."""
+    def save_file(self, uploaded_file, save_dir: Union[str, Path] = None) -> Path:
+        """Sauvegarder un fichier téléchargé sans l'indexer."""
         if save_dir is None:
             save_dir = DOCUMENTS_DIR
         
         save_dir = Path(save_dir)
         os.makedirs(save_dir, exist_ok=True)
         
+        # Construire le chemin de sauvegarde
+        file_path = save_dir / uploaded_file.name
+        
+        # Sauvegarder le fichier
+        with open(file_path, "wb") as f:
+            f.write(uploaded_file.getbuffer())
+        
+        print(f"Fichier {uploaded_file.name} sauvegardé avec succès.")
+        return file_path
+    
+    def save_uploaded_file(self, uploaded_file, save_dir: Union[str, Path] = None) -> Optional[Path]:
+        """Sauvegarder un fichier téléchargé et l'indexer."""
         try:
-            # Construire le chemin de sauvegarde
-            file_path = save_dir / uploaded_file.name
-            
-            # Sauvegarder le fichier
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            print(f"Fichier {uploaded_file.name} sauvegardé avec succès.")
+            file_path = self.save_file(uploaded_file, save_dir)
             
             # Indexer le fichier
             self.index_file(file_path)
@@ -92,4 +234,4 @@ class IndexingPipeline:
             
         except Exception as e:
             print(f"Erreur lors de la sauvegarde du fichier {uploaded_file.name}: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
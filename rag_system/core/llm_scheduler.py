@@ -0,0 +1,212 @@
+import time
+import queue
+import random
+import hashlib
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError
+from typing import Dict, Any, Callable, Hashable, Optional
+
+from config.config import (
+    LLM_MAX_CONCURRENCY,
+    LLM_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY
+)
+
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+RATE_LIMIT_ERRORS = ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable")
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Déterminer si une erreur provient d'une limite de débit ou d'une surcharge du fournisseur."""
+    if type(error).__name__ in RATE_LIMIT_ERRORS:
+        return True
+
+    # Seuls le type et le code HTTP comptent: un "429" dans le message peut être un identifiant
+    status = getattr(error, "code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status in (429, 503)
+
+
+def prompt_key(*parts: Any) -> str:
+    """Construire une clé de coalescence à partir du contenu d'une requête."""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+class LLMScheduler:
+    """Planificateur des appels à un fournisseur LLM.
+
+    Les appels passent par une file à priorité traitée par `max_concurrency`
+    workers. Chaque appel a une échéance; les erreurs de limite de débit sont
+    réessayées avec un backoff exponentiel, et les appels identiques en cours
+    (même clé) sont coalescés en un seul appel au fournisseur.
+
+    L'échéance n'interrompt pas un appel déjà commencé: les fonctions soumises
+    doivent borner elles-mêmes leur durée (délai de requête du fournisseur),
+    sans quoi un appel bloqué occupe son worker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_delay: float = LLM_RETRY_BASE_DELAY,
+        max_retry_delay: float = 30.0
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.max_retry_delay = max_retry_delay
+
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+        self._queue_waits = deque(maxlen=1000)
+        self._metrics = {
+            "submitted": 0,
+            "coalesced": 0,
+            "completed": 0,
+            "failed": 0,
+            "expired": 0,
+            "retries": 0
+        }
+
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"llm-{name}-{i}", daemon=True)
+            for i in range(max_concurrency)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(
+        self,
+        fn: Callable[[], Any],
+        key: Optional[Hashable] = None,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None
+    ) -> Future:
+        """Soumettre un appel; retourne le futur partagé si un appel identique est en cours."""
+        with self._lock:
+            self._metrics["submitted"] += 1
+            if key is not None and key in self._inflight:
+                self._metrics["coalesced"] += 1
+                return self._inflight[key]
+
+            future = Future()
+            if key is not None:
+                self._inflight[key] = future
+
+        if key is not None:
+            future.add_done_callback(lambda _: self._release(key, future))
+
+        now = time.monotonic()
+        task = {
+            "fn": fn,
+            "future": future,
+            "enqueued_at": now,
+            "deadline": now + (timeout if timeout is not None else self.timeout)
+        }
+        self._queue.put((priority, next(self._sequence), task))
+        return future
+
+    def run(
+        self,
+        fn: Callable[[], Any],
+        key: Optional[Hashable] = None,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """Soumettre un appel et attendre son résultat jusqu'à l'échéance."""
+        timeout = timeout if timeout is not None else self.timeout
+        future = self.submit(fn, key=key, priority=priority, timeout=timeout)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            raise TimeoutError(f"Délai de {timeout:g} s dépassé pour l'appel au LLM ({self.name}).")
+
+    def _release(self, key: Hashable, future: Future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _record(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def _worker(self):
+        """Boucle d'un worker: exécuter les appels par ordre de priorité."""
+        while True:
+            _, _, task = self._queue.get()
+            future = task["future"]
+
+            started = time.monotonic()
+            with self._lock:
+                self._queue_waits.append((started - task["enqueued_at"]) * 1000)
+
+            if started > task["deadline"]:
+                self._record("expired")
+                future.set_exception(TimeoutError("Échéance dépassée avant l'exécution de l'appel au LLM."))
+                continue
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            attempt = 0
+            while True:
+                try:
+                    result = task["fn"]()
+                except Exception as e:
+                    delay = min(self.max_retry_delay, self.retry_base_delay * (2 ** attempt))
+                    delay *= random.uniform(0.5, 1.0)
+                    if (
+                        is_rate_limit_error(e)
+                        and attempt < self.max_retries
+                        and time.monotonic() + delay < task["deadline"]
+                    ):
+                        attempt += 1
+                        self._record("retries")
+                        print(f"Limite de débit atteinte ({self.name}), nouvel essai dans {delay:.1f} s.")
+                        time.sleep(delay)
+                        continue
+
+                    self._record("failed")
+                    future.set_exception(e)
+                else:
+                    self._record("completed")
+                    future.set_result(result)
+                break
+
+    def metrics(self) -> Dict[str, Any]:
+        """Obtenir les métriques de la file (attente, coalescence, réessais)."""
+        with self._lock:
+            metrics = dict(self._metrics)
+            waits = sorted(self._queue_waits)
+            metrics["in_flight"] = len(self._inflight)
+
+        metrics["queue_depth"] = self._queue.qsize()
+        metrics["queue_wait_p50_ms"] = waits[len(waits) // 2] if waits else 0.0
+        metrics["queue_wait_p95_ms"] = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+        metrics["queue_wait_max_ms"] = waits[-1] if waits else 0.0
+        return metrics
+
+
+_schedulers: Dict[str, LLMScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(provider: str) -> LLMScheduler:
+    """Obtenir le planificateur partagé d'un fournisseur (limites communes au processus)."""
+    with _schedulers_lock:
+        if provider not in _schedulers:
+            _schedulers[provider] = LLMScheduler(provider)
+        return _schedulers[provider]
@@ -1,10 +1,11 @@
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional, Union
 
 import google.generativeai as genai
 from langchain_community.llms.ollama import Ollama
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
-from langchain.schema import BaseMessage, HumanMessage, AIMessage
 from langchain.schema.runnable import RunnablePassthrough
 from langchain.schema.output_parser import StrOutputParser
 
@@ -13,32 +14,57 @@ from config.config import (
     GEMINI_API_KEY,
     GEMINI_MODEL,
     OLLAMA_URL,
-    OLLAMA_MODEL
+    OLLAMA_MODEL,
+    OLLAMA_KEEP_ALIVE,
+    LLM_TIMEOUT
 )
+from core.conversation_manager import ConversationManager
+from core.llm_scheduler import get_scheduler, prompt_key, PRIORITY_NORMAL
 
 
 class LLMService:
     """Service pour interagir avec différents modèles LLM."""
     
-    def __init__(self):
-        self.provider = LLM_PROVIDER.lower()
+    def __init__(self, provider: Optional[str] = None, model=None):
+        self.provider = (provider or LLM_PROVIDER).lower()
         
         if self.provider == "gemini":
-            # Configurer l'API Gemini
-            if not GEMINI_API_KEY:
-                raise ValueError("Clé API Gemini non configurée. Veuillez l'ajouter dans le fichier .env")
-            
-            genai.configure(api_key=GEMINI_API_KEY)
-            self.model = genai.GenerativeModel(GEMINI_MODEL)
+            if model is not None:
+                # Modèle fourni par l'appelant (par exemple un modèle factice de profilage)
+                self.model = model
+            else:
+                # Configurer l'API Gemini
+                if not GEMINI_API_KEY:
+                    raise ValueError("Clé API Gemini non configurée. Veuillez l'ajouter dans le fichier .env")
+                
+                genai.configure(api_key=GEMINI_API_KEY)
+                self.model = genai.GenerativeModel(GEMINI_MODEL)
             self.llm_chain = None
         
         elif self.provider == "ollama":
             # Configurer Ollama
-            self.ollama = Ollama(base_url=OLLAMA_URL, model=OLLAMA_MODEL)
+            self.ollama = Ollama(
+                base_url=OLLAMA_URL,
+                model=OLLAMA_MODEL,
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                timeout=max(1, round(LLM_TIMEOUT))
+            )
             self.llm_chain = None
         
         else:
             raise ValueError(f"Fournisseur LLM non pris en charge: {self.provider}")
+        
+        # Délai des requêtes au fournisseur: un appel bloqué ne doit pas occuper un worker indéfiniment
+        self.request_options = {"timeout": LLM_TIMEOUT}
+        
+        # Planificateur partagé: concurrence, échéances, backoff et coalescence des appels
+        self.scheduler = get_scheduler(self.provider)
+        
+        # Historique de chat borné et sessions Gemini réutilisées par conversation
+        self.conversation_manager = ConversationManager(summarize=self._summarize)
+        self.chat_sessions = OrderedDict()
+        self.max_chat_sessions = 100
+        self.chat_sessions_lock = threading.Lock()
     
     def _get_rag_prompt_template(self) -> str:
         """Obtenir le template de prompt pour les requêtes RAG."""
@@ -74,8 +100,26 @@ class LLMService:
                 | StrOutputParser()
             )
     
-    def generate_response(self, query: str, context: Optional[List[Dict[str, Any]]] = None) -> str:
-        """Générer une réponse en utilisant le modèle LLM configuré."""
+    def generate_response(
+        self,
+        query: str,
+        context: Optional[List[Dict[str, Any]]] = None,
+        priority: int = PRIORITY_NORMAL
+    ) -> str:
+        """Générer une réponse en utilisant le modèle LLM configuré.
+        
+        Les chunks de `context` sont ceux envoyés au modèle, quel que soit le
+        fournisseur. L'appel passe par le planificateur du fournisseur: les
+        requêtes identiques en cours sont coalescées en un seul appel.
+        """
+        # Sans contexte fourni, la chaîne Ollama effectue sa propre recherche
+        if not context and self.provider == "ollama" and self.llm_chain:
+            return self.scheduler.run(
+                lambda: self.llm_chain.invoke(query),
+                key=prompt_key("chain", query),
+                priority=priority
+            )
+        
         if not context:
             if hasattr(self, 'retriever') and self.retriever:
                 context_docs = self.retriever.get_relevant_documents(query)
@@ -84,49 +128,139 @@ class LLMService:
             else:
                 context = []
         
+        # Un contexte fourni (résultats MMR ou reranking) est envoyé tel quel au modèle
+        return self._complete(self.format_rag_prompt(query, context), priority=priority)
+    
+    def format_rag_prompt(self, query: str, context: List[Dict[str, Any]]) -> str:
+        """Construire le prompt RAG à partir de la question et des chunks récupérés."""
+        return self._get_rag_prompt_template().format(
+            context="\n\n".join([item["text"] for item in context]),
+            question=query
+        )
+    
+    def _complete(self, prompt: str, priority: int = PRIORITY_NORMAL) -> str:
+        """Envoyer un prompt textuel simple au modèle configuré, via le planificateur."""
         if self.provider == "gemini":
-            # Formater le contexte et la requête pour Gemini
-            prompt = self._get_rag_prompt_template().format(
-                context="\n\n".join([item["text"] for item in context]),
-                question=query
-            )
-            
-            response = self.model.generate_content(prompt)
-            return response.text
+            call = lambda: self.model.generate_content(prompt, request_options=self.request_options).text
+        else:
+            call = lambda: self.ollama.invoke(prompt)
         
-        elif self.provider == "ollama":
-            if self.llm_chain:
-                return self.llm_chain.invoke(query)
-            else:
-                # Fallback si la chaîne n'est pas configurée
-                prompt = self._get_rag_prompt_template().format(
-                    context="\n\n".join([item["text"] for item in context]),
-                    question=query
-                )
-                return self.ollama.invoke(prompt)
+        return self.scheduler.run(call, key=prompt_key("complete", prompt), priority=priority)
+    
+    def _summarize(self, transcript: str, priority: int = PRIORITY_NORMAL) -> str:
+        """Résumer une portion de conversation pour compacter l'historique."""
+        prompt = (
+            "Résumez la conversation suivante de façon concise. Conservez les faits, "
+            "les questions posées et les réponses importantes.\n\n"
+            f"{transcript}\n\nRÉSUMÉ:"
+        )
+        # Le tour de l'utilisateur attend ce résumé: même priorité que l'appel qui le demande
+        return self._complete(prompt, priority=priority).strip()
+    
+    @staticmethod
+    def _summary_preamble(summary: str) -> str:
+        return f"Résumé des échanges précédents:\n{summary}"
     
-    def chat(self, messages: List[Dict[str, str]]) -> str:
-        """Effectuer une conversation en mode chat."""
+    def _gemini_history(self, summary: Optional[str], messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """Convertir l'historique compacté au format attendu par Gemini."""
+        gemini_messages = []
+        if summary:
+            gemini_messages.append({"role": "user", "parts": [self._summary_preamble(summary)]})
+            gemini_messages.append({"role": "model", "parts": ["Compris."]})
+        
+        for msg in messages:
+            if msg["role"] == "user":
+                gemini_messages.append({"role": "user", "parts": [msg["content"]]})
+            elif msg["role"] == "assistant":
+                gemini_messages.append({"role": "model", "parts": [msg["content"]]})
+        
+        return gemini_messages
+    
+    @staticmethod
+    def _session_history(session) -> List[tuple]:
+        """Obtenir l'historique d'une session Gemini sous forme comparable."""
+        return [
+            (content.role, "".join(part.text for part in content.parts))
+            for content in session.history
+        ]
+    
+    def _gemini_chat(
+        self,
+        history: List[Dict[str, Any]],
+        conversation_id: Optional[str],
+        priority: int = PRIORITY_NORMAL
+    ) -> str:
+        """Envoyer le dernier message en réutilisant la session Gemini de la conversation.
+        
+        La session n'est recréée que si son historique ne correspond plus à
+        l'historique compacté (par exemple après un nouveau résumé).
+        """
+        previous, last = history[:-1], history[-1]
+        expected = [(item["role"], "".join(item["parts"])) for item in previous]
+        
+        session = None
+        if conversation_id is not None:
+            with self.chat_sessions_lock:
+                session = self.chat_sessions.get(conversation_id)
+            if session is not None and self._session_history(session) != expected:
+                session = None
+        
+        if session is None:
+            session = self.model.start_chat(history=previous)
+            if conversation_id is not None:
+                with self.chat_sessions_lock:
+                    self.chat_sessions[conversation_id] = session
+                    self.chat_sessions.move_to_end(conversation_id)
+                    while len(self.chat_sessions) > self.max_chat_sessions:
+                        self.chat_sessions.popitem(last=False)
+        
+        # La session porte un état propre à la conversation: pas de coalescence
+        return self.scheduler.run(
+            lambda: session.send_message(last["parts"][0], request_options=self.request_options).text,
+            priority=priority
+        )
+    
+    def _ollama_chat_prompt(self, summary: Optional[str], messages: List[Dict[str, str]]) -> str:
+        """Construire un prompt de chat dont le préfixe reste stable d'un tour à l'autre."""
+        labels = {"user": "Utilisateur", "assistant": "Assistant"}
+        parts = []
+        if summary:
+            parts.append(self._summary_preamble(summary))
+        for msg in messages:
+            if msg["role"] in labels:
+                parts.append(f"{labels[msg['role']]}: {msg['content']}")
+        parts.append("Assistant:")
+        return "\n\n".join(parts)
+    
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        conversation_id: Optional[str] = None,
+        priority: int = PRIORITY_NORMAL
+    ) -> str:
+        """Effectuer une conversation en mode chat.
+        
+        L'historique est compacté au budget de tokens; `conversation_id` permet de
+        réutiliser la session du fournisseur entre deux tours.
+        """
+        compacted = self.conversation_manager.compact(messages, priority=priority)
+        summary, recent = compacted["summary"], compacted["messages"]
+        
         if self.provider == "gemini":
-            # Convertir les messages au format attendu par Gemini
-            gemini_messages = []
-            for msg in messages:
-                if msg["role"] == "user":
-                    gemini_messages.append({"role": "user", "parts": [msg["content"]]})
-                elif msg["role"] == "assistant":
-                    gemini_messages.append({"role": "model", "parts": [msg["content"]]})
+            history = self._gemini_history(summary, recent)
             
-            response = self.model.generate_content(gemini_messages)
-            return response.text
+            if history and history[-1]["role"] == "user":
+                return self._gemini_chat(history, conversation_id, priority=priority)
+            
+            return self.scheduler.run(
+                lambda: self.model.generate_content(history, request_options=self.request_options).text,
+                priority=priority
+            )
         
         elif self.provider == "ollama":
-            # Convertir les messages au format LangChain
-            langchain_messages = []
-            for msg in messages:
-                if msg["role"] == "user":
-                    langchain_messages.append(HumanMessage(content=msg["content"]))
-                elif msg["role"] == "assistant":
-                    langchain_messages.append(AIMessage(content=msg["content"]))
-            
-            response = self.ollama.invoke(langchain_messages)
-            return response 
\ No newline at end of file
+            # Ollama garde le modèle chargé (keep_alive) et réutilise le cache du préfixe commun
+            return self._complete(self._ollama_chat_prompt(summary, recent), priority=priority)
+    
+    def get_scheduler_metrics(self) -> Dict[str, Any]:
+        """Obtenir les métriques du planificateur d'appels LLM."""
+        return self.scheduler.metrics()
@@ -0,0 +1,332 @@
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from pathlib import Path
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+
+from core.elasticsearch_manager import ElasticsearchManager
+from core.indexing_pipeline import IndexingPipeline
+from core.llm_service import LLMService
+from core.llm_scheduler import get_scheduler
+from core.rag_service import RAGService
+from core.ann_tuner import ANNTuner
+from config.config import BASE_DIR, ELASTICSEARCH_INDEX
+
+
+# Fonctions d'attente: les threads qui y sont bloqués sont considérés inactifs
+IDLE_FUNCTIONS = {"wait", "get", "select", "poll", "accept", "sleep", "_wait_for_tstate_lock", "serve_forever", "_worker"}
+
+
+class SamplingProfiler:
+    """Échantillonne les piles d'appels de tous les threads à intervalle régulier.
+
+    Contrairement à cProfile, limité au thread qui l'active, l'échantillonnage
+    couvre aussi les workers (embedding, planificateur LLM, requêtes bulk). Les
+    piles sont agrégées au format « folded » (flamegraph.pl, speedscope).
+    """
+
+    def __init__(self, interval_ms: float = 5.0):
+        self.interval_s = interval_ms / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        name = getattr(code, "co_qualname", code.co_name)
+        return f"{name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+    def _sample(self):
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        main_ident = threading.main_thread().ident
+
+        for ident, frame in sys._current_frames().items():
+            if ident == self._thread.ident:
+                continue
+            # Ignorer les workers en attente de travail; le thread principal reste visible
+            if ident != main_ident and frame.f_code.co_name in IDLE_FUNCTIONS:
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+
+            thread = threads.get(ident)
+            stack.append(thread.name if thread else str(ident))
+            self.stacks[";".join(reversed(stack))] += 1
+
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_s):
+            self._sample()
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def write_folded(self, path: Union[str, Path]):
+        """Écrire les piles agrégées (une ligne `pile;d'appels nombre` par pile)."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _StubResponse:
+    def __init__(self, prompt):
+        self.text = f"Réponse simulée ({len(str(prompt))} caractères de prompt)."
+
+
+class _StubChatSession:
+    def __init__(self, model: "_StubGenerativeModel"):
+        self.model = model
+
+    def send_message(self, content, request_options=None):
+        return self.model.generate_content(content, request_options=request_options)
+
+
+class _StubGenerativeModel:
+    """Modèle factice: simule la latence d'un appel LLM sans appel réseau."""
+
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+
+    def generate_content(self, prompt, request_options=None):
+        time.sleep(self.latency_ms / 1000)
+        return _StubResponse(prompt)
+
+    def start_chat(self, history=None):
+        return _StubChatSession(self)
+
+
+class StubLLMService(LLMService):
+    """LLMService sans fournisseur externe, pour profiler le reste du pipeline.
+
+    Le prompt est construit et l'appel passe par le planificateur comme en
+    production; seule la génération est remplacée par une attente fixe.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        super().__init__(provider="gemini", model=_StubGenerativeModel(latency_ms))
+        self.scheduler = get_scheduler("stub")
+
+
+class WorkloadProfiler:
+    """Exécute un cycle représentatif (indexation puis requêtes) sous profilage.
+
+    Le travail se fait dans un index dédié. Le rapport regroupe les durées par
+    étape, le profil CPU (cProfile), les temps par fonction du projet, les plus
+    grosses allocations (tracemalloc) et des piles échantillonnées pour les
+    flame graphs.
+    """
+
+    def __init__(
+        self,
+        index_name: str,
+        stub_llm: bool = True,
+        stub_latency_ms: float = 0.0,
+        sample_interval_ms: float = 5.0,
+        trace_memory: bool = True
+    ):
+        # L'index de profilage est vidé au démarrage et supprimé à la fin
+        if index_name == ELASTICSEARCH_INDEX or not index_name.endswith("_profile"):
+            raise ValueError(
+                f"Index de profilage refusé: '{index_name}'. Utilisez un nom se terminant par '_profile'."
+            )
+
+        self.index_name = index_name
+        self.trace_memory = trace_memory
+        self.sampler = SamplingProfiler(sample_interval_ms)
+        self.cpu_profiler = cProfile.Profile()
+        self.stages: Dict[str, float] = {}
+        self.query_latencies: List[float] = []
+
+        # Initialisation (chargement des modèles) hors profilage
+        start = time.perf_counter()
+        self.es_manager = ElasticsearchManager(index_name=index_name)
+        self.es_manager.delete_all_documents()
+        self.pipeline = IndexingPipeline(es_manager=self.es_manager)
+        llm_service = StubLLMService(stub_latency_ms) if stub_llm else LLMService()
+        self.rag_service = RAGService(es_manager=self.es_manager, llm_service=llm_service, indexing_pipeline=self.pipeline)
+        self.setup_s = time.perf_counter() - start
+
+    @contextmanager
+    def _stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - start
+
+    def _run_workload(self, documents_dir: Path, queries: Optional[List[str]], num_queries: int) -> List[str]:
+        with self._stage("index"):
+            self.pipeline.index_directory(documents_dir)
+            self.es_manager.client.indices.refresh(index=self.index_name)
+
+        if not queries:
+            queries = ANNTuner(self.es_manager).sample_queries(num_queries=num_queries)
+
+        with self._stage("query"):
+            for query in queries:
+                start = time.perf_counter()
+                self.rag_service.process_query(query)
+                self.query_latencies.append((time.perf_counter() - start) * 1000)
+
+        return queries
+
+    def run(
+        self,
+        documents_dir: Union[str, Path],
+        output_dir: Union[str, Path],
+        queries: Optional[List[str]] = None,
+        num_queries: int = 20,
+        top: int = 30
+    ) -> Dict[str, Any]:
+        """Profiler le cycle complet et écrire les résultats dans `output_dir`."""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        if self.trace_memory:
+            tracemalloc.start(10)
+        self.sampler.start()
+        self.cpu_profiler.enable()
+        try:
+            queries = self._run_workload(Path(documents_dir), queries, num_queries)
+        finally:
+            self.cpu_profiler.disable()
+            self.sampler.stop()
+            if self.trace_memory:
+                memory_snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+        report = {
+            "index": self.index_name,
+            "setup_s": self.setup_s,
+            "stages_s": self.stages,
+            "chunks": self.es_manager.get_document_count(),
+            "queries": len(queries),
+            "query_latency_ms": self._latency_summary(),
+            "functions": self._function_timings(top),
+            "samples": self.sampler.samples
+        }
+        if self.trace_memory:
+            report["memory_peak_mb"] = peak / 1024 / 1024
+            report["allocations"] = self._top_allocations(memory_snapshot, top)
+
+        self.cpu_profiler.dump_stats(str(output_dir / "cpu.prof"))
+        self.sampler.write_folded(output_dir / "stacks.folded")
+        with open(output_dir / "report.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        with open(output_dir / "report.txt", "w", encoding="utf-8") as f:
+            f.write(self.format_report(report))
+            f.write("\n\nProfil CPU (thread principal, trié par temps cumulé)\n")
+            f.write(self._cpu_stats_text(top))
+
+        return report
+
+    def _latency_summary(self) -> Dict[str, float]:
+        if not self.query_latencies:
+            return {}
+        latencies = np.array(self.query_latencies)
+        return {
+            "mean": float(latencies.mean()),
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "max": float(latencies.max())
+        }
+
+    def _function_timings(self, top: int) -> List[Dict[str, Any]]:
+        """Temps par fonction du projet (hors dépendances), triés par temps cumulé."""
+        stats = pstats.Stats(self.cpu_profiler)
+        timings = []
+        for (filename, lineno, name), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            path = Path(filename)
+            if BASE_DIR not in path.parents or path == Path(__file__):
+                continue
+            timings.append({
+                "function": f"{path.relative_to(BASE_DIR)}:{lineno}({name})",
+                "calls": ncalls,
+                "own_s": tottime,
+                "cumulative_s": cumtime
+            })
+
+        timings.sort(key=lambda item: item["cumulative_s"], reverse=True)
+        return timings[:top]
+
+    def _cpu_stats_text(self, top: int) -> str:
+        stream = io.StringIO()
+        pstats.Stats(self.cpu_profiler, stream=stream).sort_stats("cumulative").print_stats(top)
+        return stream.getvalue()
+
+    @staticmethod
+    def _top_allocations(snapshot: tracemalloc.Snapshot, top: int) -> List[Dict[str, Any]]:
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")
+        ])
+        allocations = []
+        for stat in snapshot.statistics("lineno")[:top]:
+            frame = stat.traceback[0]
+            allocations.append({
+                "location": f"{frame.filename}:{frame.lineno}",
+                "size_kb": stat.size / 1024,
+                "count": stat.count
+            })
+        return allocations
+
+    @staticmethod
+    def format_report(report: Dict[str, Any]) -> str:
+        """Mettre en forme le rapport de profilage."""
+        lines = [
+            f"Index de profilage: {report['index']} ({report['chunks']} chunks, {report['queries']} requêtes)",
+            f"Initialisation (hors profil): {report['setup_s']:.2f} s",
+            "Durée des étapes: " + ", ".join(f"{name} {seconds:.2f} s" for name, seconds in report["stages_s"].items())
+        ]
+
+        latency = report["query_latency_ms"]
+        if latency:
+            lines.append(
+                f"Latence des requêtes: moyenne {latency['mean']:.0f} ms, p50 {latency['p50']:.0f} ms, "
+                f"p95 {latency['p95']:.0f} ms, max {latency['max']:.0f} ms"
+            )
+        if "memory_peak_mb" in report:
+            lines.append(f"Pic mémoire suivi (tracemalloc): {report['memory_peak_mb']:.1f} Mo")
+        lines.append(f"Échantillons de piles: {report['samples']}")
+
+        lines.append("")
+        lines.append(f"{'cumulé (s)':>11} {'propre (s)':>11} {'appels':>8}  fonction")
+        for item in report["functions"]:
+            lines.append(
+                f"{item['cumulative_s']:>11.3f} {item['own_s']:>11.3f} {item['calls']:>8}  {item['function']}"
+            )
+
+        if report.get("allocations"):
+            lines.append("")
+            lines.append(f"{'taille (Ko)':>12} {'blocs':>8}  emplacement")
+            for item in report["allocations"]:
+                lines.append(f"{item['size_kb']:>12.1f} {item['count']:>8}  {item['location']}")
+
+        return "\n".join(lines)
+
+    def cleanup(self):
+        """Supprimer l'index de profilage."""
+        self.es_manager.client.indices.delete(index=self.index_name, ignore_unavailable=True)
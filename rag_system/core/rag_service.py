@@ -1,22 +1,53 @@
+from concurrent.futures import TimeoutError
 from typing import List, Dict, Any, Optional
 
 from core.elasticsearch_manager import ElasticsearchManager
 from core.llm_service import LLMService
 from core.indexing_pipeline import IndexingPipeline
+from config.config import RERANK_ENABLED, RERANK_CANDIDATES, RERANK_TOP_N
 
 
 class RAGService:
     """Service principal pour coordonner les fonctionnalités RAG."""
     
-    def __init__(self):
-        self.es_manager = ElasticsearchManager()
-        self.llm_service = LLMService()
-        self.indexing_pipeline = IndexingPipeline()
+    def __init__(
+        self,
+        es_manager: Optional[ElasticsearchManager] = None,
+        llm_service: Optional[LLMService] = None,
+        indexing_pipeline: Optional[IndexingPipeline] = None
+    ):
+        # Partager le pipeline de l'application pour que ses statistiques (déduplication) soient visibles ici
+        if indexing_pipeline is not None:
+            es_manager = es_manager or indexing_pipeline.es_manager
+        self.es_manager = es_manager or ElasticsearchManager()
+        self.llm_service = llm_service or LLMService()
+        self.indexing_pipeline = indexing_pipeline or IndexingPipeline(es_manager=self.es_manager)
+        self.reranker = None
+        if RERANK_ENABLED:
+            from core.reranker import CrossEncoderReranker
+            self.reranker = CrossEncoderReranker()
         
         # Configurer la chaîne RAG
         retriever = self.es_manager.get_retriever(k=5)
         self.llm_service.setup_rag_chain(retriever)
     
+    def retrieve(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Récupérer les chunks pertinents, réordonnés par le cross-encoder s'il est activé.
+        
+        Sans reranking (désactivé ou budget de latence dépassé), les `k` premiers
+        résultats de la recherche vectorielle sont utilisés.
+        """
+        if self.reranker is None:
+            return self.es_manager.search_documents(query, k=k)
+        
+        candidates = self.es_manager.search_documents(query, k=max(RERANK_CANDIDATES, k))
+        results, info = self.reranker.rerank(query, candidates, top_n=RERANK_TOP_N)
+        if not info["reranked"]:
+            if "skip_reason" in info:
+                print(f"Reranking ignoré ({info['skip_reason']}).")
+            return candidates[:k]
+        return results
+    
     def process_query(self, query: str, use_rag: bool = True) -> Dict[str, Any]:
         """Traiter une requête utilisateur avec le système RAG."""
         if not query:
@@ -24,7 +55,7 @@ class RAGService:
         
         if use_rag:
             # Récupérer les documents pertinents
-            search_results = self.es_manager.search_documents(query, k=5)
+            search_results = self.retrieve(query, k=5)
             
             if not search_results:
                 return {
@@ -37,18 +68,10 @@ class RAGService:
             # Générer une réponse basée sur les documents
             response = self.llm_service.generate_response(query, context=search_results)
             
-            # Extraire les sources des documents
-            sources = []
-            for result in search_results:
-                if "metadata" in result and "source" in result["metadata"]:
-                    source = result["metadata"]["source"]
-                    if source not in sources:
-                        sources.append(source)
-            
             return {
                 "answer": response,
                 "context": [item["text"] for item in search_results],
-                "sources": sources
+                "sources": self._extract_sources(search_results)
             }
         else:
             # Réponse directe sans RAG
@@ -60,19 +83,86 @@ class RAGService:
                 "sources": []
             }
     
+    @staticmethod
+    def _extract_sources(search_results: List[Dict[str, Any]]) -> List[str]:
+        """Extraire les sources distinctes des documents récupérés."""
+        sources = []
+        for result in search_results:
+            if "metadata" in result and "source" in result["metadata"]:
+                source = result["metadata"]["source"]
+                if source not in sources:
+                    sources.append(source)
+        return sources
+    
+    def process_chat(
+        self,
+        messages: List[Dict[str, str]],
+        conversation_id: Optional[str] = None,
+        use_rag: bool = True
+    ) -> Dict[str, Any]:
+        """Répondre au dernier message d'une conversation, avec récupération RAG.
+        
+        L'historique envoyé ne contient que les questions et réponses; le
+        contexte récupéré n'accompagne que la dernière question, pour que la
+        taille des prompts ne croisse pas avec les chunks des tours précédents.
+        """
+        if not messages or not messages[-1].get("content"):
+            return {"answer": "Veuillez poser une question.", "context": [], "sources": []}
+        
+        query = messages[-1]["content"]
+        search_results = []
+        prompt = query
+        
+        if use_rag:
+            search_results = self.retrieve(query, k=5)
+            if not search_results:
+                return {
+                    "answer": "Je n'ai pas trouvé d'informations pertinentes pour répondre à votre question. "
+                             "Essayez de reformuler votre question ou d'ajouter plus de documents à la base de connaissances.",
+                    "context": [],
+                    "sources": []
+                }
+            prompt = self.llm_service.format_rag_prompt(query, search_results)
+        
+        history = [{"role": message["role"], "content": message["content"]} for message in messages[:-1]]
+        try:
+            answer = self.llm_service.chat(history + [{"role": "user", "content": prompt}], conversation_id=conversation_id)
+        except TimeoutError as e:
+            answer = f"{str(e)} Le service est très sollicité, veuillez réessayer dans un instant."
+        
+        return {
+            "answer": answer,
+            "context": [item["text"] for item in search_results],
+            "sources": self._extract_sources(search_results)
+        }
+    
     def get_stats(self) -> Dict[str, Any]:
         """Obtenir des statistiques sur l'état actuel du système."""
         doc_count = self.es_manager.get_document_count()
         
-        return {
+        stats = {
             "document_count": doc_count,
             "index_name": self.es_manager.index_name,
-            "llm_provider": self.llm_service.provider
+            "llm_provider": self.llm_service.provider,
+            "deduplication": self.indexing_pipeline.dedup_stats,
+            "llm_scheduler": self.llm_service.get_scheduler_metrics()
         }
+        
+        if self.reranker is not None:
+            stats["reranker"] = self.reranker.stats()
+        
+        # Statistiques du worker d'embedding partagé, s'il est activé
+        if hasattr(self.es_manager.base_embeddings, "stats"):
+            try:
+                stats["embedding_worker"] = self.es_manager.base_embeddings.stats()
+            except Exception as e:
+                print(f"Erreur lors de la lecture des statistiques d'embedding: {str(e)}")
+        
+        return stats
     
-    def chat(self, messages: List[Dict[str, str]]) -> str:
+    def chat(self, messages: List[Dict[str, str]], conversation_id: Optional[str] = None) -> str:
         """Répondre dans un contexte de chat."""
         if not messages:
             return "Veuillez fournir des messages pour le chat."
         
-        return self.llm_service.chat(messages) 
\ No newline at end of file
+        return self.llm_service.chat(messages, conversation_id=conversation_id) 
\ No newline at end of file
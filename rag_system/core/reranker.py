@@ -0,0 +1,113 @@
+import time
+import threading
+from typing import List, Dict, Any, Tuple
+
+from config.config import (
+    RERANK_MODEL,
+    RERANK_BATCH_SIZE,
+    RERANK_BUDGET_MS,
+    EMBEDDING_NUM_THREADS
+)
+
+
+class CrossEncoderReranker:
+    """Réordonne les candidats de la recherche vectorielle avec un cross-encoder.
+
+    Les paires (requête, chunk) sont évaluées par lots sur CPU. Si le budget de
+    latence ne permet pas d'évaluer tous les candidats (estimation à partir des
+    appels précédents, ou dépassement en cours de route), le reranking est
+    abandonné et l'ordre de la recherche vectorielle est conservé.
+    """
+
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL,
+        batch_size: int = RERANK_BATCH_SIZE,
+        budget_ms: float = RERANK_BUDGET_MS,
+        max_length: int = 512,
+        num_threads: int = EMBEDDING_NUM_THREADS
+    ):
+        import torch
+        from sentence_transformers import CrossEncoder
+
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+
+        self._lock = threading.Lock()
+        self._pair_ms = None  # Moyenne glissante du temps par paire
+        self._stats = {"queries": 0, "reranked": 0, "skipped": 0, "total_ms": 0.0}
+
+    def _score(self, query: str, texts: List[str]) -> Tuple[List[float], float]:
+        """Évaluer les paires par lots; retourne des scores partiels si le budget est dépassé."""
+        start = time.perf_counter()
+        scores = []
+
+        for batch_start in range(0, len(texts), self.batch_size):
+            batch = texts[batch_start:batch_start + self.batch_size]
+            scores.extend(float(score) for score in self.model.predict(
+                [(query, text) for text in batch],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            ))
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms > self.budget_ms and len(scores) < len(texts):
+                break
+
+        return scores, (time.perf_counter() - start) * 1000
+
+    def rerank(self, query: str, candidates: List[Dict[str, Any]], top_n: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Garder les `top_n` meilleurs candidats selon le cross-encoder."""
+        info = {"candidates": len(candidates), "reranked": False, "elapsed_ms": 0.0}
+        if len(candidates) <= 1:
+            return candidates[:top_n], info
+
+        with self._lock:
+            self._stats["queries"] += 1
+            pair_ms = self._pair_ms
+
+        # Ne pas commencer si l'estimation dépasse déjà le budget
+        if pair_ms is not None and pair_ms * len(candidates) > self.budget_ms:
+            info["skip_reason"] = f"estimation de {pair_ms * len(candidates):.0f} ms"
+            with self._lock:
+                # Décroissance de l'estimation, pour réessayer après un ralentissement passager
+                self._pair_ms *= 0.9
+        else:
+            scores, elapsed_ms = self._score(query, [candidate["text"] for candidate in candidates])
+            info["elapsed_ms"] = elapsed_ms
+
+            with self._lock:
+                measured = elapsed_ms / len(scores)
+                self._pair_ms = measured if self._pair_ms is None else 0.8 * self._pair_ms + 0.2 * measured
+                self._stats["total_ms"] += elapsed_ms
+
+            if len(scores) < len(candidates):
+                info["skip_reason"] = f"budget de {self.budget_ms:g} ms dépassé"
+            else:
+                ranked = sorted(zip(scores, candidates), key=lambda pair: pair[0], reverse=True)
+                results = [dict(candidate, rerank_score=score) for score, candidate in ranked[:top_n]]
+                info["reranked"] = True
+                with self._lock:
+                    self._stats["reranked"] += 1
+                return results, info
+
+        with self._lock:
+            self._stats["skipped"] += 1
+        return candidates[:top_n], info
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du reranking (requêtes traitées, abandons, latence moyenne)."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pair_ms"] = self._pair_ms
+
+        scored = stats["reranked"] + stats["skipped"]
+        stats["mean_ms"] = stats.pop("total_ms") / scored if scored else 0.0
+        stats["model"] = self.model_name
+        stats["budget_ms"] = self.budget_ms
+        return stats
@@ -0,0 +1,99 @@
+import json
+import time
+import base64
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel: repli sur le module json standard
+    orjson = None
+
+
+# Version minimale d'ElasticSearch acceptant des vecteurs float encodés en base64
+BASE64_VECTORS_MIN_VERSION = (9, 1)
+
+
+def resolve_vector_encoding(client, encoding: str) -> str:
+    """Vérifier que le cluster accepte l'encodage de vecteurs demandé, sinon revenir à 'float'."""
+    encoding = encoding.lower()
+    if encoding == "float":
+        return encoding
+    if encoding != "base64":
+        raise ValueError(f"Encodage de vecteurs non pris en charge: {encoding}")
+
+    try:
+        number = client.info()["version"]["number"]
+        version = tuple(int(part) for part in number.split("-")[0].split(".")[:2])
+    except Exception as e:
+        print(f"Impossible de lire la version d'ElasticSearch ({str(e)}); vecteurs envoyés en float.")
+        return "float"
+
+    if version < BASE64_VECTORS_MIN_VERSION:
+        print(f"ElasticSearch {number} n'accepte pas les vecteurs en base64; vecteurs envoyés en float.")
+        return "float"
+    return encoding
+
+
+def decode_vector(value) -> np.ndarray:
+    """Lire un `_source.vector`, stocké en liste de floats ou en base64 (float32 big-endian)."""
+    if isinstance(value, str):
+        return np.frombuffer(base64.b64decode(value), dtype=">f4").astype(np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+class BulkSourceEncoder:
+    """Sérialise directement en octets les documents des requêtes bulk.
+
+    Les vecteurs restent des tableaux float32 contigus jusqu'à la sérialisation:
+    orjson les encode sans passer par des listes de floats Python, et l'encodage
+    'base64' envoie les 4 octets big-endian de chaque composante.
+    """
+
+    def __init__(self, encoding: str = "float"):
+        self.encoding = encoding
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"chunks": 0, "bytes": 0, "serialization_ms": 0.0}
+
+    @staticmethod
+    def to_float32(vectors) -> np.ndarray:
+        """Convertir un lot de vecteurs en matrice float32 contiguë."""
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def _vector_value(self, vector: np.ndarray):
+        if self.encoding == "base64":
+            return base64.b64encode(vector.astype(">f4").tobytes()).decode("ascii")
+        return vector
+
+    def encode(self, text: str, metadata: Dict[str, Any], vector: np.ndarray) -> bytes:
+        """Sérialiser le _source d'un chunk."""
+        start = time.perf_counter()
+        source = {"text": text, "metadata": metadata, "vector": self._vector_value(vector)}
+
+        if orjson is not None:
+            payload = orjson.dumps(source, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+        else:
+            if isinstance(source["vector"], np.ndarray):
+                source["vector"] = source["vector"].tolist()
+            payload = json.dumps(source, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        self.stats["chunks"] += 1
+        self.stats["bytes"] += len(payload)
+        self.stats["serialization_ms"] += (time.perf_counter() - start) * 1000
+        return payload
+
+    def summary(self) -> Optional[Dict[str, Any]]:
+        """Résumer les statistiques de sérialisation (octets et temps par chunk)."""
+        if not self.stats["chunks"]:
+            return None
+        return {
+            "encoding": self.encoding,
+            "serializer": "orjson" if orjson is not None else "json",
+            "chunks": self.stats["chunks"],
+            "bytes_per_chunk": self.stats["bytes"] / self.stats["chunks"],
+            "serialization_ms": self.stats["serialization_ms"],
+            "serialization_us_per_chunk": self.stats["serialization_ms"] * 1000 / self.stats["chunks"]
+        }
@@ -0,0 +1,188 @@
+import gzip
+import json
+import time
+import shutil
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Union
+
+import numpy as np
+from elasticsearch import Elasticsearch, helpers
+
+from core.dimensionality_reduction import PCA_DIR
+from core.serialization import BulkSourceEncoder, resolve_vector_encoding, decode_vector
+from config.config import VECTOR_ENCODING
+
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+class VectorSnapshot:
+    """Export et import des chunks indexés (texte, métadonnées, vecteurs).
+
+    Un snapshot est un répertoire contenant un manifeste JSON et des fragments:
+    les vecteurs en `.npy` (float32) et les textes/métadonnées en JSON Lines
+    compressé. L'import recharge l'index sans recalculer aucun embedding.
+    """
+
+    def __init__(self, client: Elasticsearch, index_name: str):
+        self.client = client
+        self.index_name = index_name
+
+    def _write_shard(self, directory: Path, shard_id: int, records: List[Dict[str, Any]], vectors: List[np.ndarray]) -> Dict[str, Any]:
+        """Écrire un fragment (vecteurs + enregistrements) sur disque."""
+        vectors_file = f"vectors-{shard_id:05d}.npy"
+        records_file = f"records-{shard_id:05d}.jsonl.gz"
+
+        np.save(directory / vectors_file, np.asarray(vectors, dtype=np.float32))
+        with gzip.open(directory / records_file, "wt", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write("\n")
+
+        return {"vectors": vectors_file, "records": records_file, "count": len(records)}
+
+    def export_to(self, output_dir: Union[str, Path], shard_size: int = 50000, scroll_size: int = 1000) -> Dict[str, Any]:
+        """Exporter l'index vers un répertoire de snapshot, en flux."""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        mapping = self.client.indices.get_mapping(index=self.index_name)[self.index_name]["mappings"]
+        dims = mapping["properties"]["vector"]["dims"]
+
+        start = time.perf_counter()
+        shards = []
+        records, vectors = [], []
+
+        for hit in helpers.scan(
+            self.client,
+            index=self.index_name,
+            query={"query": {"match_all": {}}, "_source": ["text", "metadata", "vector"]},
+            size=scroll_size
+        ):
+            source = hit["_source"]
+            records.append({"id": hit["_id"], "text": source["text"], "metadata": source.get("metadata", {})})
+            vectors.append(decode_vector(source["vector"]))
+
+            if len(records) >= shard_size:
+                shards.append(self._write_shard(output_dir, len(shards), records, vectors))
+                print(f"{sum(shard['count'] for shard in shards)} chunks exportés...")
+                records, vectors = [], []
+
+        if records:
+            shards.append(self._write_shard(output_dir, len(shards), records, vectors))
+
+        # Joindre la projection PCA de l'index, nécessaire pour l'interroger après restauration
+        pca_version = mapping.get("_meta", {}).get("pca_version")
+        if pca_version is not None:
+            shutil.copy2(PCA_DIR / f"pca_v{pca_version}.npz", output_dir / f"pca_v{pca_version}.npz")
+
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "index": self.index_name,
+            "mappings": mapping,
+            "dims": dims,
+            "count": sum(shard["count"] for shard in shards),
+            "shards": shards,
+            "created_at": time.time()
+        }
+        with open(output_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        manifest["elapsed_s"] = time.perf_counter() - start
+        return manifest
+
+    @staticmethod
+    def read_manifest(input_dir: Union[str, Path]) -> Dict[str, Any]:
+        """Lire le manifeste d'un snapshot."""
+        with open(Path(input_dir) / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Format de snapshot non pris en charge: {manifest.get('format_version')}")
+        return manifest
+
+    def _iter_actions(
+        self,
+        input_dir: Path,
+        manifest: Dict[str, Any],
+        encoder: BulkSourceEncoder
+    ) -> Iterator[Dict[str, Any]]:
+        """Générer les actions bulk à partir des fragments, sans tout charger en mémoire."""
+        for shard in manifest["shards"]:
+            vectors = np.load(input_dir / shard["vectors"], mmap_mode="r")
+            with gzip.open(input_dir / shard["records"], "rt", encoding="utf-8") as f:
+                for line, vector in zip(f, vectors):
+                    record = json.loads(line)
+                    yield {
+                        "_index": self.index_name,
+                        "_id": record["id"],
+                        "_source": encoder.encode(record["text"], record["metadata"], np.asarray(vector))
+                    }
+
+    def _create_index(self, manifest: Dict[str, Any]):
+        """Créer l'index avec le mapping du snapshot, ou vérifier la compatibilité de l'existant."""
+        if self.client.indices.exists(index=self.index_name):
+            mapping = self.client.indices.get_mapping(index=self.index_name)[self.index_name]["mappings"]
+            if mapping["properties"]["vector"]["dims"] != manifest["dims"]:
+                raise ValueError(
+                    f"L'index '{self.index_name}' a des vecteurs de dimension "
+                    f"{mapping['properties']['vector']['dims']}, le snapshot de dimension {manifest['dims']}."
+                )
+            if mapping.get("_meta", {}).get("pca_version") != manifest["mappings"].get("_meta", {}).get("pca_version"):
+                raise ValueError(f"L'index '{self.index_name}' n'utilise pas la même projection PCA que le snapshot.")
+        else:
+            self.client.indices.create(index=self.index_name, body={"mappings": manifest["mappings"]})
+            print(f"Index '{self.index_name}' créé à partir du snapshot.")
+
+    def import_from(
+        self,
+        input_dir: Union[str, Path],
+        thread_count: int = 4,
+        chunk_size: int = 500
+    ) -> Dict[str, Any]:
+        """Importer un snapshot dans l'index par requêtes bulk parallèles."""
+        input_dir = Path(input_dir)
+        manifest = self.read_manifest(input_dir)
+        self._create_index(manifest)
+
+        pca_version = manifest["mappings"].get("_meta", {}).get("pca_version")
+        if pca_version is not None and not (PCA_DIR / f"pca_v{pca_version}.npz").exists():
+            PCA_DIR.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(input_dir / f"pca_v{pca_version}.npz", PCA_DIR / f"pca_v{pca_version}.npz")
+            print(f"Projection PCA v{pca_version} installée depuis le snapshot.")
+
+        # Pas de rafraîchissement pendant le chargement massif
+        settings = self.client.indices.get_settings(index=self.index_name)
+        refresh_interval = settings[self.index_name]["settings"]["index"].get("refresh_interval")
+        self.client.indices.put_settings(index=self.index_name, body={"index": {"refresh_interval": "-1"}})
+
+        start = time.perf_counter()
+        success, failed = 0, 0
+        encoder = BulkSourceEncoder(resolve_vector_encoding(self.client, VECTOR_ENCODING))
+        try:
+            for ok, item in helpers.parallel_bulk(
+                self.client,
+                self._iter_actions(input_dir, manifest, encoder),
+                thread_count=thread_count,
+                chunk_size=chunk_size,
+                raise_on_error=False
+            ):
+                if ok:
+                    success += 1
+                else:
+                    failed += 1
+                if (success + failed) % 50000 == 0:
+                    print(f"{success + failed}/{manifest['count']} chunks importés...")
+        finally:
+            self.client.indices.put_settings(
+                index=self.index_name, body={"index": {"refresh_interval": refresh_interval}}
+            )
+            self.client.indices.refresh(index=self.index_name)
+
+        return {
+            "count": success,
+            "failed": failed,
+            "elapsed_s": time.perf_counter() - start,
+            "serialization": encoder.summary()
+        }
@@ -29,8 +29,34 @@ def index_documents(directory_path=None):
     print(f"Indexation terminée. {num_indexed} chunks indexés.")
 
 
-def clear_index():
-    """Supprimer tous les documents de l'index."""
+def watch_documents(args):
+    """Indexer en continu les documents ajoutés, modifiés ou supprimés."""
+    from core.document_watcher import DocumentWatcher
+    from config.config import DOCUMENTS_DIR
+    
+    watcher = DocumentWatcher(
+        directory=args.directory or DOCUMENTS_DIR,
+        debounce_s=args.debounce,
+        max_delay_s=args.max_delay
+    )
+    watcher.run_forever()
+    print(
+        f"{watcher.stats['batches']} lots traités: {watcher.stats['indexed_chunks']} chunks indexés, "
+        f"{watcher.stats['deleted_chunks']} retirés."
+    )
+
+
+def clear_index(drop=False):
+    """Supprimer tous les documents de l'index (ou l'index lui-même)."""
+    if drop:
+        # Sans passer par ElasticsearchManager, qui refuse un index de dimension incompatible
+        from elasticsearch import Elasticsearch
+        from config.config import ELASTICSEARCH_URL, ELASTICSEARCH_INDEX
+        
+        Elasticsearch(ELASTICSEARCH_URL).indices.delete(index=ELASTICSEARCH_INDEX, ignore_unavailable=True)
+        print(f"Index '{ELASTICSEARCH_INDEX}' supprimé. Il sera recréé à la prochaine indexation.")
+        return
+    
     from core.indexing_pipeline import IndexingPipeline
     
     pipeline = IndexingPipeline()
@@ -38,7 +64,219 @@ def clear_index():
     print("Index effacé avec succès.")
 
 
+def _parse_list(value, cast=int):
+    """Convertir une liste séparée par des virgules en liste typée."""
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def tune_ann(args):
+    """Comparer rappel et latence de plusieurs configurations kNN."""
+    from core.ann_tuner import ANNTuner
+    
+    tuner = ANNTuner()
+    
+    if args.queries:
+        queries = tuner.load_queries(args.queries)
+    else:
+        queries = tuner.sample_queries(num_queries=args.num_queries)
+    
+    results = tuner.run(
+        queries,
+        k=args.k,
+        num_candidates_values=_parse_list(args.num_candidates),
+        m_values=_parse_list(args.m),
+        ef_construction_values=_parse_list(args.ef_construction),
+        index_types=_parse_list(args.index_types, cast=str),
+        keep_indices=args.keep_indices
+    )
+    
+    print()
+    print(tuner.format_report(results, args.k))
+    
+    best = tuner.recommend(results, args.target_recall)
+    if best:
+        print(
+            f"\nConfiguration recommandée (rappel >= {args.target_recall}): "
+            f"VECTOR_INDEX_TYPE={best['index_type']} HNSW_M={best['m']} "
+            f"HNSW_EF_CONSTRUCTION={best['ef_construction']} KNN_NUM_CANDIDATES={best['num_candidates']}"
+        )
+    else:
+        print(f"\nAucune configuration n'atteint le rappel cible de {args.target_recall}.")
+
+
+def export_onnx(args):
+    """Exporter le modèle d'embedding en ONNX et vérifier la parité avec PyTorch."""
+    from core.embeddings import ONNXEmbeddings, create_embeddings, export_onnx_model, compare_embeddings
+    
+    model_dir = export_onnx_model(quantize=not args.no_quantize)
+    
+    if args.texts:
+        with open(args.texts, "r", encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = [
+            "Qu'est-ce qu'un système RAG et comment fonctionne-t-il?",
+            "ElasticSearch est un moteur de recherche distribué basé sur Lucene.",
+            "LangChain facilite l'intégration de sources de données et de modèles de langage.",
+            "Quelle est la politique de remboursement des frais de déplacement?",
+            # Texte plus long que la limite du modèle, pour vérifier la troncature
+            " ".join(
+                f"Section {i}: les frais de déplacement sont remboursés sur présentation des justificatifs, "
+                "dans la limite des plafonds fixés par la politique interne de l'entreprise."
+                for i in range(1, 41)
+            ),
+        ]
+    
+    reference = create_embeddings(backend="huggingface", worker="none")
+    variants = [("onnx fp32", False)] + ([] if args.no_quantize else [("onnx int8", True)])
+    
+    for name, quantized in variants:
+        report = compare_embeddings(reference, ONNXEmbeddings(model_dir, quantized=quantized), texts)
+        min_cosine = min(report["min_cosine"], report["documents_min_cosine"])
+        status = "OK" if min_cosine >= args.min_cosine else "ÉCART TROP IMPORTANT"
+        print(
+            f"{name}: cosinus min={report['min_cosine']:.4f} moyen={report['mean_cosine']:.4f} "
+            f"(par lot: min={report['documents_min_cosine']:.4f}), "
+            f"latence requête {report['candidate_ms']:.1f} ms (PyTorch {report['reference_ms']:.1f} ms) [{status}]"
+        )
+
+
+def run_embedding_worker(args):
+    """Lancer le worker d'embedding partagé en sidecar HTTP."""
+    from core.embeddings import create_embeddings
+    from core.embedding_worker import EmbeddingBatcher, serve_embedding_worker
+    
+    batcher = EmbeddingBatcher(
+        create_embeddings(worker="none"),
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms
+    )
+    serve_embedding_worker(batcher, host=args.host, port=args.port)
+
+
+def benchmark_mmr(args):
+    """Mesurer la latence ajoutée par la sélection MMR."""
+    from utils.mmr import benchmark_mmr as run_benchmark
+    
+    results = run_benchmark(
+        fetch_k_values=_parse_list(args.fetch_k),
+        k=args.k,
+        dims=args.dims,
+        lambda_mult=args.lambda_mult,
+        repeats=args.repeats
+    )
+    
+    for result in results:
+        print(
+            f"fetch_k={result['fetch_k']} k={result['k']} dims={result['dims']}: "
+            f"moyenne {result['mean_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms"
+        )
+
+
+def fit_pca(args):
+    """Ajuster une projection PCA sur un échantillon de l'index et mesurer le rappel."""
+    from core.elasticsearch_manager import ElasticsearchManager
+    from core.dimensionality_reduction import fit_projection_from_index
+    
+    es_manager = ElasticsearchManager()
+    if es_manager.projection is not None:
+        print("L'index utilise déjà une projection PCA; ajustez la projection sur un index en dimension complète.")
+        return
+    
+    report = fit_projection_from_index(
+        es_manager,
+        dims=args.dims,
+        sample_size=args.sample,
+        num_queries=args.num_queries,
+        k=args.k
+    )
+    
+    print(f"Projection PCA v{report['version']} enregistrée: {report['path']}")
+    print(f"Dimensions: {report['input_dims']} -> {report['output_dims']} "
+          f"(mémoire vectorielle divisée par {report['input_dims'] / report['output_dims']:.1f})")
+    print(f"Variance expliquée: {report['explained_variance']:.3f}")
+    print(f"Rappel@{report['k']} exact: 1.000 avant, {report['recall']:.3f} après réduction")
+    print(f"Pour l'utiliser: PCA_VERSION={report['version']}, puis supprimez l'index "
+          f"(python main.py clear --drop) et réindexez.")
+
+
+def _snapshot(index_name=None):
+    """Créer l'outil de snapshot sans charger le modèle d'embedding."""
+    from elasticsearch import Elasticsearch
+    from core.snapshot import VectorSnapshot
+    from config.config import ELASTICSEARCH_URL, ELASTICSEARCH_INDEX
+    
+    return VectorSnapshot(Elasticsearch(ELASTICSEARCH_URL), index_name or ELASTICSEARCH_INDEX)
+
+
+def export_snapshot(args):
+    """Exporter textes, métadonnées et vecteurs de l'index vers un snapshot."""
+    manifest = _snapshot(args.index).export_to(args.output, shard_size=args.shard_size)
+    print(
+        f"Snapshot exporté dans {args.output}: {manifest['count']} chunks "
+        f"({manifest['dims']} dimensions) en {manifest['elapsed_s']:.1f} s."
+    )
+
+
+def import_snapshot(args):
+    """Recharger un snapshot dans l'index sans recalculer les embeddings."""
+    report = _snapshot(args.index).import_from(args.input, thread_count=args.threads)
+    rate = report["count"] / report["elapsed_s"] if report["elapsed_s"] else 0
+    print(
+        f"Snapshot importé: {report['count']} chunks, {report['failed']} échecs, "
+        f"en {report['elapsed_s']:.1f} s ({rate:.0f} chunks/s)."
+    )
+    if report["serialization"]:
+        print(
+            f"Sérialisation: {report['serialization']['bytes_per_chunk']:.0f} octets/chunk, "
+            f"{report['serialization']['serialization_ms'] / 1000:.1f} s au total"
+        )
+
+
+def profile_workload(args):
+    """Profiler un cycle d'indexation et de requêtes dans un index dédié."""
+    import time
+    from core.profiler import WorkloadProfiler
+    from config.config import DOCUMENTS_DIR, ELASTICSEARCH_INDEX, PROFILES_DIR
+    
+    output_dir = Path(args.output) if args.output else PROFILES_DIR / time.strftime("%Y%m%d-%H%M%S")
+    try:
+        profiler = WorkloadProfiler(
+            index_name=args.index or f"{ELASTICSEARCH_INDEX}_profile",
+            stub_llm=not args.real_llm,
+            stub_latency_ms=args.stub_latency_ms,
+            sample_interval_ms=args.interval_ms,
+            trace_memory=not args.no_memory
+        )
+    except ValueError as e:
+        print(str(e))
+        return
+    queries = None
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    
+    try:
+        report = profiler.run(
+            args.directory or DOCUMENTS_DIR,
+            output_dir,
+            queries=queries,
+            num_queries=args.num_queries,
+            top=args.top
+        )
+    finally:
+        if not args.keep_index:
+            profiler.cleanup()
+    
+    print()
+    print(profiler.format_report(report))
+    print()
+    print(f"Rapport, profil CPU (cpu.prof) et piles pour flame graph (stacks.folded) écrits dans {output_dir}")
+
+
 def main():
+    from config.config import EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_WAIT_MS, WATCH_DEBOUNCE_S, WATCH_MAX_DELAY_S
+    
     parser = argparse.ArgumentParser(description="Système RAG avec ElasticSearch et LangChain")
     
     subparsers = parser.add_subparsers(dest="command", help="Commande à exécuter")
@@ -52,8 +290,114 @@ def main():
         "--directory", "-d", help="Chemin du répertoire à indexer"
     )
     
+    # Commande watch
+    watch_parser = subparsers.add_parser("watch", help="Indexer en continu les changements du répertoire de documents")
+    watch_parser.add_argument(
+        "--directory", "-d", help="Répertoire à surveiller (par défaut DOCUMENTS_DIR)"
+    )
+    watch_parser.add_argument(
+        "--debounce", type=float, default=WATCH_DEBOUNCE_S, help="Secondes de calme avant de traiter un lot"
+    )
+    watch_parser.add_argument(
+        "--max-delay", type=float, default=WATCH_MAX_DELAY_S, help="Attente maximale pendant une rafale"
+    )
+    
     # Commande clear
     clear_parser = subparsers.add_parser("clear", help="Effacer l'index")
+    clear_parser.add_argument(
+        "--drop", action="store_true", help="Supprimer l'index et son mapping (changement de dimension)"
+    )
+    
+    # Commande tune-ann
+    tune_parser = subparsers.add_parser(
+        "tune-ann", help="Mesurer rappel et latence des paramètres de recherche kNN"
+    )
+    tune_parser.add_argument(
+        "--queries", "-q", help="Fichier de requêtes (une par ligne); par défaut, échantillonnées dans l'index"
+    )
+    tune_parser.add_argument("--num-queries", type=int, default=50, help="Nombre de requêtes échantillonnées")
+    tune_parser.add_argument("-k", type=int, default=5, help="Nombre de résultats comparés (rappel@k)")
+    tune_parser.add_argument("--num-candidates", default="50,100,200", help="Valeurs de num_candidates")
+    tune_parser.add_argument("--m", default="16", help="Valeurs du paramètre HNSW m")
+    tune_parser.add_argument("--ef-construction", default="100", help="Valeurs du paramètre HNSW ef_construction")
+    tune_parser.add_argument("--index-types", default="hnsw", help="Types d'index (hnsw, int8_hnsw)")
+    tune_parser.add_argument("--target-recall", type=float, default=0.95, help="Rappel minimal visé")
+    tune_parser.add_argument(
+        "--keep-indices", action="store_true", help="Conserver les index temporaires créés"
+    )
+    
+    # Commande onnx-export
+    onnx_parser = subparsers.add_parser(
+        "onnx-export", help="Exporter le modèle d'embedding en ONNX et vérifier la parité"
+    )
+    onnx_parser.add_argument("--no-quantize", action="store_true", help="Ne pas générer la variante int8")
+    onnx_parser.add_argument("--texts", help="Fichier de textes de contrôle (un par ligne)")
+    onnx_parser.add_argument(
+        "--min-cosine", type=float, default=0.99, help="Similarité cosinus minimale attendue avec PyTorch"
+    )
+    
+    # Commande embedding-worker
+    worker_parser = subparsers.add_parser(
+        "embedding-worker", help="Lancer le worker d'embedding partagé (micro-lots)"
+    )
+    worker_parser.add_argument("--host", default="127.0.0.1", help="Adresse d'écoute")
+    worker_parser.add_argument("--port", type=int, default=8765, help="Port d'écoute")
+    worker_parser.add_argument(
+        "--max-batch-size", type=int, default=EMBEDDING_BATCH_SIZE, help="Nombre maximal de textes par lot"
+    )
+    worker_parser.add_argument(
+        "--max-wait-ms", type=float, default=EMBEDDING_MAX_WAIT_MS, help="Attente maximale pour former un lot"
+    )
+    
+    # Commande bench-mmr
+    mmr_parser = subparsers.add_parser("bench-mmr", help="Mesurer la latence de la sélection MMR")
+    mmr_parser.add_argument("--fetch-k", default="20,50,100", help="Tailles d'ensembles de candidats")
+    mmr_parser.add_argument("-k", type=int, default=5, help="Nombre de résultats sélectionnés")
+    mmr_parser.add_argument("--dims", type=int, default=384, help="Dimension des vecteurs")
+    mmr_parser.add_argument("--lambda-mult", type=float, default=0.5, help="Compromis pertinence/diversité")
+    mmr_parser.add_argument("--repeats", type=int, default=200, help="Nombre de mesures par taille")
+    
+    # Commande pca-fit
+    pca_parser = subparsers.add_parser(
+        "pca-fit", help="Ajuster une projection PCA des embeddings et mesurer le rappel"
+    )
+    pca_parser.add_argument("--dims", type=int, default=128, help="Dimension cible")
+    pca_parser.add_argument("--sample", type=int, default=5000, help="Nombre de chunks échantillonnés")
+    pca_parser.add_argument("--num-queries", type=int, default=200, help="Nombre de requêtes de contrôle")
+    pca_parser.add_argument("-k", type=int, default=5, help="Nombre de résultats comparés (rappel@k)")
+    
+    # Commandes export / import
+    export_parser = subparsers.add_parser("export", help="Exporter l'index vers un snapshot de vecteurs")
+    export_parser.add_argument("--output", "-o", required=True, help="Répertoire du snapshot")
+    export_parser.add_argument("--index", help="Index à exporter (par défaut ELASTICSEARCH_INDEX)")
+    export_parser.add_argument("--shard-size", type=int, default=50000, help="Chunks par fragment")
+    
+    import_parser = subparsers.add_parser("import", help="Importer un snapshot de vecteurs dans l'index")
+    import_parser.add_argument("--input", "-i", required=True, help="Répertoire du snapshot")
+    import_parser.add_argument("--index", help="Index cible (par défaut ELASTICSEARCH_INDEX)")
+    import_parser.add_argument("--threads", type=int, default=4, help="Requêtes bulk en parallèle")
+    
+    # Commande profile
+    profile_parser = subparsers.add_parser(
+        "profile", help="Profiler l'indexation et les requêtes (CPU, mémoire, flame graph)"
+    )
+    profile_parser.add_argument("--directory", "-d", help="Documents à indexer (par défaut DOCUMENTS_DIR)")
+    profile_parser.add_argument(
+        "--queries", "-q", help="Fichier de requêtes (une par ligne); par défaut, échantillonnées dans l'index"
+    )
+    profile_parser.add_argument("--num-queries", type=int, default=20, help="Nombre de requêtes échantillonnées")
+    profile_parser.add_argument("--output", "-o", help="Répertoire du rapport (par défaut data/profiles/<date>)")
+    profile_parser.add_argument(
+        "--index", help="Index de profilage, nom en '_profile' (par défaut <ELASTICSEARCH_INDEX>_profile)"
+    )
+    profile_parser.add_argument("--real-llm", action="store_true", help="Appeler le vrai fournisseur LLM")
+    profile_parser.add_argument(
+        "--stub-latency-ms", type=float, default=0.0, help="Latence simulée du LLM factice"
+    )
+    profile_parser.add_argument("--interval-ms", type=float, default=5.0, help="Intervalle d'échantillonnage des piles")
+    profile_parser.add_argument("--no-memory", action="store_true", help="Désactiver tracemalloc (moins de surcoût)")
+    profile_parser.add_argument("--top", type=int, default=30, help="Nombre de lignes par section du rapport")
+    profile_parser.add_argument("--keep-index", action="store_true", help="Conserver l'index de profilage")
     
     args = parser.parse_args()
     
@@ -61,8 +405,26 @@ def main():
         run_streamlit_app()
     elif args.command == "index":
         index_documents(args.directory)
+    elif args.command == "watch":
+        watch_documents(args)
     elif args.command == "clear":
-        clear_index()
+        clear_index(args.drop)
+    elif args.command == "tune-ann":
+        tune_ann(args)
+    elif args.command == "onnx-export":
+        export_onnx(args)
+    elif args.command == "embedding-worker":
+        run_embedding_worker(args)
+    elif args.command == "bench-mmr":
+        benchmark_mmr(args)
+    elif args.command == "pca-fit":
+        fit_pca(args)
+    elif args.command == "export":
+        export_snapshot(args)
+    elif args.command == "import":
+        import_snapshot(args)
+    elif args.command == "profile":
+        profile_workload(args)
     else:
         parser.print_help()
 
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Vérifications du comportement des composants, sans ElasticSearch ni LLM.
+Elles complètent test_system.py et peuvent s'exécuter sur un poste de développement.
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+from concurrent.futures import TimeoutError
+
+# Ajouter le répertoire parent au chemin de recherche Python
+parent_dir = Path(__file__).resolve().parent
+if str(parent_dir) not in sys.path:
+    sys.path.append(str(parent_dir))
+
+from langchain_core.documents import Document
+
+from core.conversation_manager import ConversationManager
+from core.llm_scheduler import LLMScheduler, PRIORITY_HIGH, PRIORITY_LOW
+from utils.deduplication import ChunkDeduplicator
+from utils.mmr import maximal_marginal_relevance
+
+
+def test_deduplication():
+    """Tester l'élimination des doublons et le suivi de leurs sources."""
+    print("Test de déduplication des chunks...")
+
+    text = " ".join(
+        f"Article {i}: les frais de déplacement sont remboursés sur présentation des justificatifs originaux."
+        for i in range(1, 16)
+    )
+    documents = [
+        Document(page_content=text, metadata={"source": "a.txt"}),
+        Document(page_content="  " + text.upper() + "\n", metadata={"source": "b.txt"}),
+        Document(page_content=text + " Version du 12 mars.", metadata={"source": "c.txt"}),
+        Document(page_content="Un tout autre sujet: la procédure d'accueil des nouveaux arrivants.", metadata={"source": "a.txt"}),
+    ]
+
+    try:
+        kept, report = ChunkDeduplicator().deduplicate(documents)
+
+        checks = [
+            (len(kept) == 2, f"2 chunks conservés attendus, {len(kept)} obtenus"),
+            (report["exact_duplicates"] == 1, f"1 doublon exact attendu, {report['exact_duplicates']} obtenus"),
+            (report["near_duplicates"] == 1, f"1 quasi-doublon attendu, {report['near_duplicates']} obtenus"),
+            (kept[0].metadata["sources"] == ["a.txt", "b.txt", "c.txt"], f"sources inattendues: {kept[0].metadata['sources']}"),
+            (kept[1].metadata["sources"] == ["a.txt"], f"sources inattendues: {kept[1].metadata['sources']}"),
+            (all("content_hash" in doc.metadata for doc in kept), "hash de contenu manquant"),
+        ]
+        failures = [message for ok, message in checks if not ok]
+
+        if failures:
+            for message in failures:
+                print(f"❌ {message}")
+            return False
+
+        print(f"✅ Déduplication correcte: {report['kept_chunks']} chunks conservés sur {report['input_chunks']}.")
+        return True
+    except Exception as e:
+        print(f"❌ Erreur lors de la déduplication: {str(e)}")
+        return False
+
+
+def test_conversation_compaction():
+    """Tester que l'historique reste sous le budget avec un seul résumé par tour."""
+    print("\nTest de compaction de l'historique de chat...")
+
+    calls = []
+
+    def summarize(transcript, priority):
+        calls.append(transcript)
+        return "Résumé court des échanges."
+
+    manager = ConversationManager(summarize=summarize, token_budget=2000, recent_turns=4)
+    messages = []
+    failures = []
+
+    for turn in range(6):
+        for role in ("user", "assistant"):
+            messages.append({"role": role, "content": f"{role} {turn}: " + "x" * 5200})
+            calls_before = len(calls)
+            compacted = manager.compact(messages)
+            tokens = manager._count_tokens(compacted["messages"], compacted["summary"])
+
+            if tokens > manager.token_budget:
+                failures.append(f"{len(messages)} messages: {tokens} tokens envoyés pour un budget de 2000")
+            if len(calls) - calls_before > 1:
+                failures.append(f"{len(messages)} messages: {len(calls) - calls_before} résumés pour un seul tour")
+            if compacted["messages"][-1] is not messages[-1]:
+                failures.append(f"{len(messages)} messages: le dernier message n'est pas conservé")
+
+    # Historique sous le budget: envoyé tel quel, sans résumé
+    short = [{"role": "user", "content": "Bonjour"}, {"role": "assistant", "content": "Bonjour!"}]
+    if manager.compact(short) != {"summary": None, "messages": short}:
+        failures.append("un historique sous le budget a été compacté")
+
+    if failures:
+        for message in failures:
+            print(f"❌ {message}")
+        return False
+
+    print(f"✅ Compaction correcte: budget respecté à chaque tour, {len(calls)} résumés pour {len(messages)} messages.")
+    return True
+
+
+class InMemoryChunkStore:
+    """Remplace ElasticsearchManager pour la déduplication entre fichiers indexés séparément."""
+
+    vector_dims = 384
+
+    def __init__(self):
+        self.chunks = {}
+
+    def _find(self, field, values):
+        return [
+            (chunk_id, metadata) for chunk_id, metadata in self.chunks.items()
+            if set(values) & set(metadata[field] if isinstance(metadata[field], list) else [metadata[field]])
+        ]
+
+    def find_existing_chunks(self, content_hashes):
+        return {
+            metadata["content_hash"]: {"id": chunk_id, "sources": list(metadata["sources"])}
+            for chunk_id, metadata in self._find("content_hash", content_hashes)
+        }
+
+    def find_similar_chunks(self, band_keys):
+        return [
+            {"id": chunk_id, "sources": list(metadata["sources"]), "minhash": metadata["minhash"],
+             "minhash_bands": metadata["minhash_bands"]}
+            for chunk_id, metadata in self._find("minhash_bands", band_keys)
+        ]
+
+    def add_chunk_sources(self, new_sources):
+        for chunk_id, sources in new_sources.items():
+            self.chunks[chunk_id]["sources"].extend(sources)
+
+    def index_documents(self, documents):
+        for doc in documents:
+            self.chunks[str(len(self.chunks))] = doc.metadata
+        return len(documents)
+
+
+def test_cross_file_deduplication():
+    """Tester la détection des quasi-doublons déjà indexés depuis un autre fichier."""
+    print("\nTest de déduplication entre fichiers...")
+
+    try:
+        from core.indexing_pipeline import IndexingPipeline
+
+        text = " ".join(
+            f"Article {i}: la politique de télétravail autorise deux jours par semaine après accord du responsable."
+            for i in range(1, 16)
+        )
+        store = InMemoryChunkStore()
+        pipeline = IndexingPipeline(es_manager=store)
+
+        # Deux fichiers indexés séparément, comme dans une tâche de réindexation ou avec watch
+        for source, content in [("politique_v1.txt", text), ("politique_v2.txt", text + " Mise à jour de mars.")]:
+            store.index_documents(pipeline.deduplicate([Document(page_content=content, metadata={"source": source})]))
+
+        sources = [metadata["sources"] for metadata in store.chunks.values()]
+        if sources != [["politique_v1.txt", "politique_v2.txt"]]:
+            print(f"❌ Chunks indexés inattendus (sources): {sources}")
+            return False
+
+        print("✅ Déduplication entre fichiers correcte: la seconde version rejoint le chunk indexé.")
+        return True
+    except Exception as e:
+        print(f"❌ Erreur lors de la déduplication entre fichiers: {str(e)}")
+        return False
+
+
+class TooManyRequests(Exception):
+    """Erreur de limite de débit simulée."""
+
+
+def test_llm_scheduler():
+    """Tester la coalescence, les priorités, les réessais et un appel bloqué."""
+    print("\nTest du planificateur LLM...")
+
+    failures = []
+    try:
+        # Coalescence et priorités: un seul worker, occupé pendant la soumission
+        scheduler = LLMScheduler("test", max_concurrency=1, timeout=5.0, retry_base_delay=0.01)
+        release = threading.Event()
+        order = []
+        scheduler.submit(release.wait)
+        low = scheduler.submit(lambda: order.append("low"), priority=PRIORITY_LOW)
+        first = scheduler.submit(lambda: order.append("high") or "réponse", key="q", priority=PRIORITY_HIGH)
+        second = scheduler.submit(lambda: order.append("doublon"), key="q", priority=PRIORITY_HIGH)
+        release.set()
+        low.result(timeout=2)
+
+        if first is not second or second.result() != "réponse":
+            failures.append("les appels identiques en cours n'ont pas été coalescés")
+        if order != ["high", "low"]:
+            failures.append(f"ordre d'exécution inattendu: {order}")
+
+        # Réessai après une limite de débit
+        attempts = []
+
+        def rate_limited():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise TooManyRequests("429")
+            return "ok"
+
+        if scheduler.run(rate_limited) != "ok" or len(attempts) != 3:
+            failures.append(f"réessais inattendus: {len(attempts)} tentatives")
+
+        # Un message contenant "429" ne suffit pas à en faire une limite de débit
+        attempts.clear()
+
+        def failing():
+            attempts.append(1)
+            raise ValueError("Contexte de 4290 tokens trop long")
+
+        try:
+            scheduler.run(failing)
+        except ValueError:
+            pass
+        if len(attempts) != 1:
+            failures.append(f"erreur ordinaire réessayée: {len(attempts)} tentatives")
+
+        # Appel bloqué: l'appelant est libéré à l'échéance et l'appel en attente expire
+        hung = threading.Event()
+        scheduler = LLMScheduler("test-bloque", max_concurrency=1, timeout=0.2)
+        start = time.monotonic()
+        try:
+            scheduler.run(hung.wait)
+            failures.append("l'appel bloqué n'a pas été interrompu à l'échéance")
+        except TimeoutError:
+            elapsed = time.monotonic() - start
+            if elapsed > 1.0:
+                failures.append(f"appelant libéré après {elapsed:.1f} s au lieu de 0.2 s")
+
+        queued = scheduler.submit(lambda: "trop tard")
+        time.sleep(0.3)
+        hung.set()
+        try:
+            queued.result(timeout=2)
+            failures.append("l'appel en attente derrière l'appel bloqué n'a pas expiré")
+        except TimeoutError:
+            pass
+        if scheduler.metrics()["expired"] != 1:
+            failures.append(f"métrique d'expiration inattendue: {scheduler.metrics()['expired']}")
+    except Exception as e:
+        failures.append(f"erreur inattendue: {type(e).__name__}: {str(e)}")
+
+    if failures:
+        for message in failures:
+            print(f"❌ {message}")
+        return False
+
+    print("✅ Planificateur LLM correct: coalescence, priorités, réessais et échéances respectés.")
+    return True
+
+
+def test_mmr():
+    """Tester la sélection par maximal marginal relevance."""
+    print("\nTest de la sélection MMR...")
+
+    query = [1.0, 0.0, 0.0]
+    candidates = [
+        [0.95, 0.31, 0.0],   # Le plus pertinent
+        [0.94, 0.34, 0.0],   # Presque identique au premier
+        [0.80, 0.0, 0.60],   # Moins pertinent mais différent
+    ]
+    cases = [
+        ("diversité", maximal_marginal_relevance(query, candidates, k=2, lambda_mult=0.5), [0, 2]),
+        ("pertinence seule", maximal_marginal_relevance(query, candidates, k=2, lambda_mult=1.0), [0, 1]),
+        ("k supérieur au nombre de candidats", maximal_marginal_relevance(query, candidates, k=10), [0, 2, 1]),
+        ("aucun candidat", maximal_marginal_relevance(query, [], k=3), []),
+    ]
+    failures = [f"{name}: {result} au lieu de {expected}" for name, result, expected in cases if result != expected]
+
+    if failures:
+        for message in failures:
+            print(f"❌ {message}")
+        return False
+
+    print("✅ Sélection MMR correcte: les chunks redondants sont écartés.")
+    return True
+
+
+def main():
+    """Exécuter toutes les vérifications."""
+    print("====================================")
+    print("  TEST DES COMPOSANTS")
+    print("====================================\n")
+
+    results = [
+        test_deduplication(),
+        test_cross_file_deduplication(),
+        test_conversation_compaction(),
+        test_llm_scheduler(),
+        test_mmr(),
+    ]
+
+    print("\n====================================")
+    print(f"  {sum(results)}/{len(results)} TESTS RÉUSSIS")
+    print("====================================")
+
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,163 @@
+import re
+import zlib
+import base64
+import hashlib
+from collections import defaultdict
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config.config import DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_SHINGLE_SIZE
+
+
+# Nombre premier de Mersenne utilisé pour les permutations MinHash
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class ChunkDeduplicator:
+    """Élimine les chunks identiques (hash exact) et quasi identiques (MinHash + LSH).
+
+    Deux chunks sont considérés comme quasi identiques lorsque la similarité de
+    Jaccard estimée de leurs shingles de mots dépasse `threshold`.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEDUP_THRESHOLD,
+        num_perm: int = DEDUP_NUM_PERM,
+        shingle_size: int = DEDUP_SHINGLE_SIZE,
+        seed: int = 1
+    ):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+        generator = np.random.RandomState(seed)
+        self.perm_a = generator.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.perm_b = generator.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+        self.bands, self.rows = self._optimal_bands(threshold, num_perm)
+
+    @staticmethod
+    def _optimal_bands(threshold: float, num_perm: int, min_probability: float = 0.95) -> Tuple[int, int]:
+        """Choisir le découpage LSH (bandes x lignes) le plus sélectif qui retrouve
+        encore au moins `min_probability` des paires au seuil de similarité."""
+        best = (num_perm, 1)
+        for rows in range(1, num_perm + 1):
+            if num_perm % rows:
+                continue
+            bands = num_perm // rows
+            if 1 - (1 - threshold ** rows) ** bands >= min_probability:
+                best = (bands, rows)
+        return best
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normaliser un texte (casse et espaces) avant hachage."""
+        return re.sub(r"\s+", " ", text).strip().lower()
+
+    @classmethod
+    def content_hash(cls, text: str) -> str:
+        """Calculer le hash exact du contenu normalisé."""
+        return hashlib.sha1(cls.normalize(text).encode("utf-8")).hexdigest()
+
+    def _signature(self, normalized_text: str) -> np.ndarray:
+        """Calculer la signature MinHash des shingles de mots d'un texte."""
+        words = normalized_text.split(" ")
+        size = min(self.shingle_size, len(words))
+        shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+
+        # Permutations (a*x + b) mod p calculées pour toutes les shingles d'un coup
+        permuted = (np.outer(self.perm_a, hashes) + self.perm_b[:, np.newaxis]) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=1)
+
+    def band_keys(self, signature: np.ndarray) -> List[str]:
+        """Clés LSH d'une signature, une par bande (`bande:hash des lignes`)."""
+        return [
+            f"{band}:{hashlib.sha1(signature[band * self.rows:(band + 1) * self.rows].tobytes()).hexdigest()[:16]}"
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def encode_signature(signature: np.ndarray) -> str:
+        """Encoder une signature MinHash (valeurs sur 32 bits) en base64, pour les métadonnées."""
+        return base64.b64encode(signature.astype(">u4").tobytes()).decode("ascii")
+
+    @staticmethod
+    def decode_signature(value: str) -> np.ndarray:
+        """Relire une signature encodée par `encode_signature`."""
+        return np.frombuffer(base64.b64decode(value), dtype=">u4").astype(np.uint64)
+
+    def is_near_duplicate(self, signature: np.ndarray, other: np.ndarray) -> bool:
+        """Comparer deux signatures (similarité de Jaccard estimée au-dessus du seuil)."""
+        return len(signature) == len(other) and np.mean(signature == other) >= self.threshold
+
+    @staticmethod
+    def _add_source(kept_doc: Document, duplicate: Document):
+        """Ajouter la source d'un doublon retiré à celles du chunk conservé."""
+        source = duplicate.metadata.get("source")
+        if source is not None and source not in kept_doc.metadata["sources"]:
+            kept_doc.metadata["sources"].append(source)
+
+    def deduplicate(self, documents: List[Document]) -> Tuple[List[Document], Dict[str, Any]]:
+        """Retirer les doublons exacts et quasi exacts d'une liste de chunks.
+
+        Chaque chunk conservé reçoit son hash exact dans `metadata["content_hash"]`
+        et, dans `metadata["sources"]`, les sources de tous les chunks qu'il
+        remplace: supprimer l'une d'elles ne doit pas retirer le contenu des autres.
+        Sa signature MinHash et ses clés LSH (`minhash`, `minhash_bands`) permettent
+        de retrouver ses quasi-doublons dans l'index lors des indexations suivantes.
+        """
+        kept = []
+        kept_by_hash = {}
+        signatures = []
+        signature_docs = []
+        buckets = defaultdict(list)
+        report = {"input_chunks": len(documents), "exact_duplicates": 0, "near_duplicates": 0, "bytes_saved": 0}
+
+        for doc in documents:
+            normalized = self.normalize(doc.page_content)
+            digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+            if digest in kept_by_hash:
+                report["exact_duplicates"] += 1
+                report["bytes_saved"] += len(doc.page_content.encode("utf-8"))
+                self._add_source(kept_by_hash[digest], doc)
+                continue
+
+            doc.metadata["sources"] = [doc.metadata["source"]] if "source" in doc.metadata else []
+
+            signature = self._signature(normalized) if normalized else None
+            if signature is not None:
+                band_keys = self.band_keys(signature)
+                candidates = sorted({index for key in band_keys for index in buckets.get(key, ())})
+                match = next(
+                    (index for index in candidates if self.is_near_duplicate(signature, signatures[index])),
+                    None
+                )
+                if match is not None:
+                    report["near_duplicates"] += 1
+                    report["bytes_saved"] += len(doc.page_content.encode("utf-8"))
+                    self._add_source(signature_docs[match], doc)
+                    continue
+
+                for key in band_keys:
+                    buckets[key].append(len(signatures))
+                signatures.append(signature)
+                signature_docs.append(doc)
+                doc.metadata["minhash"] = self.encode_signature(signature)
+                doc.metadata["minhash_bands"] = band_keys
+
+            kept_by_hash[digest] = doc
+            doc.metadata["content_hash"] = digest
+            kept.append(doc)
+
+        report["kept_chunks"] = len(kept)
+        return kept, report
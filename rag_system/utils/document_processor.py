@@ -10,6 +10,9 @@ from langchain_core.documents import Document
 from config.config import CHUNK_SIZE, CHUNK_OVERLAP
 
 
+SUPPORTED_EXTENSIONS = ['.pdf', '.txt', '.json']
+
+
 class DocumentProcessor:
     """Classe pour traiter différents types de documents et les préparer pour l'indexation."""
     
@@ -78,15 +81,25 @@ class DocumentProcessor:
             raise ValueError(f"{directory_path} n'est pas un répertoire valide.")
         
         all_documents = []
-        supported_extensions = ['.pdf', '.txt', '.json']
         
-        for file_path in directory_path.glob('**/*'):
-            if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
-                try:
-                    documents = self.load_document(file_path)
-                    all_documents.extend(documents)
-                    print(f"Traitement réussi: {file_path.name}")
-                except Exception as e:
-                    print(f"Erreur lors du traitement de {file_path.name}: {str(e)}")
+        for file_path in self.list_supported_files(directory_path):
+            try:
+                documents = self.load_document(file_path)
+                all_documents.extend(documents)
+                print(f"Traitement réussi: {file_path.name}")
+            except Exception as e:
+                print(f"Erreur lors du traitement de {file_path.name}: {str(e)}")
+        
+        return all_documents
+    
+    def list_supported_files(self, directory_path: Union[str, Path]) -> List[Path]:
+        """Lister les fichiers pris en charge d'un répertoire (récursivement)."""
+        directory_path = Path(directory_path)
+        
+        if not directory_path.exists() or not directory_path.is_dir():
+            raise ValueError(f"{directory_path} n'est pas un répertoire valide.")
         
-        return all_documents 
\ No newline at end of file
+        return sorted(
+            file_path for file_path in directory_path.glob('**/*')
+            if file_path.is_file() and file_path.suffix.lower() in SUPPORTED_EXTENSIONS
+        ) 
\ No newline at end of file
@@ -0,0 +1,84 @@
+import time
+from typing import List, Dict, Any, Sequence
+
+import numpy as np
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.clip(norms, 1e-12, None)
+
+
+def maximal_marginal_relevance(
+    query_vector: Sequence[float],
+    candidate_vectors: Sequence[Sequence[float]],
+    k: int = 5,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """Sélectionner k candidats par maximal marginal relevance (MMR).
+
+    Les similarités requête/candidats et candidats/candidats sont calculées en
+    une seule multiplication matricielle; chaque étape de sélection ne fait
+    ensuite que des opérations vectorielles sur les n candidats.
+    """
+    candidates = _normalize_rows(np.asarray(candidate_vectors, dtype=np.float32))
+    if candidates.ndim != 2 or len(candidates) == 0 or k <= 0:
+        return []
+
+    query = _normalize_rows(np.asarray(query_vector, dtype=np.float32))
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+
+    k = min(k, len(candidates))
+    selected = [int(np.argmax(relevance))]
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+    max_similarity = similarity[selected[0]].copy()
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+
+    return selected
+
+
+def benchmark_mmr(
+    fetch_k_values: Sequence[int] = (20, 50, 100),
+    k: int = 5,
+    dims: int = 384,
+    lambda_mult: float = 0.5,
+    repeats: int = 200,
+    seed: int = 0
+) -> List[Dict[str, Any]]:
+    """Mesurer la latence ajoutée par la sélection MMR sur des vecteurs aléatoires."""
+    generator = np.random.default_rng(seed)
+    results = []
+
+    for fetch_k in fetch_k_values:
+        query = generator.standard_normal(dims).astype(np.float32)
+        # Les candidats arrivent d'ElasticSearch sous forme de listes Python
+        candidates = generator.standard_normal((fetch_k, dims)).astype(np.float32).tolist()
+
+        maximal_marginal_relevance(query, candidates, k=k, lambda_mult=lambda_mult)
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            maximal_marginal_relevance(query, candidates, k=k, lambda_mult=lambda_mult)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings = np.array(timings)
+        results.append({
+            "fetch_k": fetch_k,
+            "k": k,
+            "dims": dims,
+            "mean_ms": float(timings.mean()),
+            "p95_ms": float(np.percentile(timings, 95))
+        })
+
+    return results